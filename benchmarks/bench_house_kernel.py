@@ -0,0 +1,69 @@
+# Micro-benchmark of the closed form House kernel against the previous NumPy 2x2 implementation.
+#
+#   python benchmarks/bench_house_kernel.py
+import logging
+import timeit
+import numpy as np
+
+from dots_infrastructure.Logger import LOGGER
+from hybridheatpumpservice.thermalsystems import House
+
+CAPACITIES = {'C_in': 26146400.0, 'C_out': 78439200.0}
+RESISTANCES = {'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+               'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074}
+WINDOW_AREA = 31.39
+NUMBER_OF_CALLS = 20000
+
+
+def numpy_update_temperatures(house: House, time_step, air_temperature, soil_temperature, solar_irradiance, heat_to_house):
+    # Reference: the explicit Euler NumPy update as implemented before the closed form kernel
+    ambient_temperatures = np.array([air_temperature, soil_temperature])
+    solar_vector = np.array([house.window_area * solar_irradiance, 0.0])
+    heat_to_house_vector = np.array([heat_to_house, 0.0])
+    house.temperatures += time_step * np.matmul(house.C_inv, - np.matmul(house.K, house.temperatures) +
+                                                np.matmul(house.K_amb, ambient_temperatures) +
+                                                solar_vector + heat_to_house_vector)
+
+
+def numpy_initial_temperatures(house: House, initial_temp_in, nominal_heat, air_temperature, soil_temperature, solar_irradiance):
+    # Reference: the equilibrium solve with np.linalg.solve as implemented before the closed form kernel
+    ambient_temperatures = np.array([air_temperature, soil_temperature])
+    solar_vector = np.array([house.window_area * solar_irradiance, 0.0])
+    A = house.K.copy()
+    A[:, 0] = np.array([-1.0, 0.0])
+    b = np.matmul(house.K_amb, ambient_temperatures) + solar_vector - initial_temp_in * house.K[:, 0].T
+    x = np.linalg.solve(A, b)
+    heat_to_house = np.clip(x[0], 0, nominal_heat)
+    return np.linalg.solve(house.K, np.matmul(house.K_amb, ambient_temperatures) + solar_vector + np.array([heat_to_house, 0]))
+
+
+def time_per_call(function):
+    return min(timeit.repeat(function, number=NUMBER_OF_CALLS, repeat=3)) / NUMBER_OF_CALLS
+
+
+def main():
+    LOGGER.setLevel(logging.WARNING)
+    house = House(CAPACITIES, RESISTANCES, WINDOW_AREA)
+    house.set_initial_temperatures(291.65, 9000.0, 283.0, 290.05, 0.0)
+    reference_house = House(CAPACITIES, RESISTANCES, WINDOW_AREA)
+    reference_house.temperatures = house.temperatures.copy()
+
+    results = measure(house, reference_house)
+    print(f"{'call':<26}{'numpy [us]':>12}{'closed form [us]':>18}{'speedup':>10}")
+    for name, (numpy_time, kernel_time) in results.items():
+        print(f"{name:<26}{numpy_time * 1e6:>12.2f}{kernel_time * 1e6:>18.2f}{numpy_time / kernel_time:>10.1f}")
+
+
+def measure(house: House, reference_house: House):
+    return {
+        "update_temperatures": (
+            time_per_call(lambda: numpy_update_temperatures(reference_house, 900, 283.0, 290.05, 120.0, 2000.0)),
+            time_per_call(lambda: house.update_temperatures(900, 283.0, 290.05, 120.0, 2000.0))),
+        "set_initial_temperatures": (
+            time_per_call(lambda: numpy_initial_temperatures(reference_house, 291.65, 9000.0, 283.0, 290.05, 0.0)),
+            time_per_call(lambda: house.set_initial_temperatures(291.65, 9000.0, 283.0, 290.05, 0.0))),
+    }
+
+
+if __name__ == "__main__":
+    main()
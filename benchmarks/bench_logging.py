@@ -0,0 +1,62 @@
+# Time of the send_temperatures and update_temperatures calculations of all houses per step with the log level
+# at INFO and at WARNING. The log records are written to a temporary file, so the numbers include formatting
+# and file I/O but not a terminal.
+#
+#   python benchmarks/bench_logging.py [number_of_houses] [number_of_steps]
+import logging
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from dots_infrastructure.DataClasses import TimeStepInformation
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.test_infra.InfluxDBMock import InfluxDBMock
+
+from hybridheatpumpservice.offline_replay import create_offline_service
+from bench_suite import START_TIME, create_weather_forecast
+from synthetic_esdl import create_energy_system
+
+
+def time_steps(energy_system, esdl_ids, number_of_steps: int, step_summary: bool) -> float:
+    service = create_offline_service(esdl_ids, START_TIME, (number_of_steps + 1) * 900)
+    service.influx_connector = InfluxDBMock()
+    service.settings.diagnostics_step_summary = step_summary
+    service.init_calculation_service(energy_system)
+
+    period = service.hybridheatpump_period_in_seconds
+    start = time.perf_counter()
+    for k in range(1, number_of_steps + 1):
+        time_step_information = TimeStepInformation(k, number_of_steps)
+        simulation_time = START_TIME + timedelta(seconds=k * period)
+        weather_params = create_weather_forecast(k)
+        for esdl_id in esdl_ids:
+            service.send_temperatures(weather_params, simulation_time, time_step_information, esdl_id, energy_system)
+        for esdl_id, thermal_power in zip(esdl_ids, service.hhp_esdl_thermalpower):
+            param_dict = dict(weather_params, heat_power_to_buffer_hhp=0.5 * thermal_power, heat_power_to_house_hhp=0.5 * thermal_power)
+            service.update_temperatures(param_dict, simulation_time, time_step_information, esdl_id, energy_system)
+        service.influx_connector.data_points.clear()
+    return (time.perf_counter() - start) / number_of_steps
+
+
+def main():
+    number_of_houses = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    number_of_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    energy_system, esdl_ids = create_energy_system(number_of_houses)
+
+    with tempfile.TemporaryFile("w") as log_file:
+        root_logger = logging.getLogger()
+        handlers = root_logger.handlers[:]
+        root_logger.handlers = [logging.StreamHandler(log_file)]
+        try:
+            for level, step_summary in [(logging.INFO, False), (logging.INFO, True), (logging.WARNING, False)]:
+                LOGGER.setLevel(level)
+                step_seconds = time_steps(energy_system, esdl_ids, number_of_steps, step_summary)
+                print(f"{number_of_houses} houses at {logging.getLevelName(level)}{' with step summary' if step_summary else ''}: "
+                      f"{step_seconds:.3f} s per step, {step_seconds / number_of_houses * 1e6:.1f} us per house")
+        finally:
+            root_logger.handlers = handlers
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Time to publish the buffer and house temperatures of all houses per step, per house as a DOUBLE and a VECTOR
+# publication against one aggregated binary message. Runs in a single federate on an in-process core, so the
+# numbers are the serialization and publication calls without the network.
+#
+#   python benchmarks/bench_publication.py [number_of_houses]
+import sys
+import time
+
+import helics as h
+import numpy as np
+
+from hybridheatpumpservice.publication import pack_temperatures
+
+
+def main():
+    number_of_houses = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    state = 290.0 + np.random.default_rng(0).random((number_of_houses, 3))
+
+    federate_info = h.helicsCreateFederateInfo()
+    h.helicsFederateInfoSetCoreType(federate_info, h.HelicsCoreType.INPROC)
+    h.helicsFederateInfoSetCoreInitString(federate_info, "--autobroker")
+    value_federate = h.helicsCreateValueFederate("bench-publication", federate_info)
+    buffer_publications = [h.helicsFederateRegisterGlobalPublication(value_federate, f"HybridHeatPump/buffer_temperature/{i}", h.HelicsDataType.DOUBLE, "K")
+                           for i in range(number_of_houses)]
+    house_publications = [h.helicsFederateRegisterGlobalPublication(value_federate, f"HybridHeatPump/house_temperatures/{i}", h.HelicsDataType.VECTOR, "K")
+                          for i in range(number_of_houses)]
+    aggregated_publication = h.helicsFederateRegisterGlobalPublication(value_federate, "HybridHeatPump/fleet_temperatures/model", h.HelicsDataType.RAW, "K")
+    h.helicsFederateEnterExecutingMode(value_federate)
+
+    start = time.perf_counter()
+    for buffer_publication, house_publication, house_state in zip(buffer_publications, house_publications, state):
+        h.helicsPublicationPublishDouble(buffer_publication, house_state[2])
+        h.helicsPublicationPublishVector(house_publication, house_state[0:2].tolist())
+    per_house_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    h.helicsPublicationPublishBytes(aggregated_publication, pack_temperatures(state))
+    aggregated_seconds = time.perf_counter() - start
+
+    h.helicsFederateDisconnect(value_federate)
+    h.helicsFederateFree(value_federate)
+    h.helicsCloseLibrary()
+    print(f"{number_of_houses} houses: per house publications {per_house_seconds * 1e3:.1f} ms, "
+          f"aggregated publication {aggregated_seconds * 1e3:.3f} ms per step")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Startup benchmark of init_calculation_service on a synthetic energy system against the previous
+# full tree walk with a json.loads of every description.
+#
+#   python benchmarks/bench_startup.py [number_of_houses]
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+
+import esdl
+import helics as h
+from dots_infrastructure import CalculationServiceHelperFunctions
+from dots_infrastructure.DataClasses import SimulatorConfiguration
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.test_infra.InfluxDBMock import InfluxDBMock
+
+from hybridheatpumpservice.hybrid_heatpump_service import CalculationServiceHybridHeatPump
+from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+from synthetic_esdl import create_energy_system
+
+
+def create_service(esdl_ids) -> CalculationServiceHybridHeatPump:
+    CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = lambda: SimulatorConfiguration(
+        "HybridHeatPump", esdl_ids, "Mock-HybridHeatPump", "127.0.0.1", 23404, "test-id", 900, datetime(2024, 1, 1),
+        "test-host", "test-port", "test-username", "test-password", "test-database-name", h.HelicsLogLevel.DEBUG, [])
+    service = CalculationServiceHybridHeatPump()
+    service.influx_connector = InfluxDBMock()
+    return service
+
+
+def walk_and_parse(service: CalculationServiceHybridHeatPump, energy_system: esdl.EnergySystem):
+    # Reference: the startup as implemented before the indexed lookup and the cached description parsing
+    hhp_assets = {}
+    for obj in energy_system.eAllContents():
+        if hasattr(obj, "id") and isinstance(obj.eContainer(), esdl.Building) and obj.id in service.simulator_configuration.esdl_ids:
+            hhp_assets[obj.id] = obj
+    houses = []
+    heat_buffers = []
+    for esdl_id in service.simulator_configuration.esdl_ids:
+        hhpsystem = hhp_assets[esdl_id]
+        building_description = json.loads(hhpsystem.eContainer().description)
+        hhp_description_dict = json.loads(hhpsystem.description)
+        heat_buffers.append(HeatBuffer(hhp_description_dict['buffer_capacitance']))
+        capacities = {'C_in': building_description['C_in'], 'C_out': building_description['C_out']}
+        resistances = {'R_exch': building_description['R_exch'], 'R_floor': building_description['R_floor'],
+                       'R_vent': building_description['R_vent'], 'R_cond': building_description['R_cond']}
+        houses.append(House(capacities, resistances, building_description['A_glass']))
+
+
+def time_call(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    LOGGER.setLevel(logging.WARNING)
+    number_of_houses = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    energy_system, esdl_ids = create_energy_system(number_of_houses)
+    service = create_service(esdl_ids)
+
+    reference_time = time_call(walk_and_parse, service, energy_system)
+    init_time = time_call(service.init_calculation_service, energy_system)
+    print(f"{number_of_houses} houses: walk and parse {reference_time:.3f} s, "
+          f"init_calculation_service {init_time:.3f} s, speedup {reference_time / init_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
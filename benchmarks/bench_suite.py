@@ -0,0 +1,166 @@
+# Benchmark suite of the hot paths of the hybrid heat pump service on synthetic energy systems, the results are
+# written as JSON so that they can be compared between releases.
+#
+#   python benchmarks/bench_suite.py --sizes 1 100 10000 100000 --steps 3 --output results.json
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+from dots_infrastructure.DataClasses import TimeStepInformation
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.test_infra.InfluxDBMock import InfluxDBMock
+
+from hybridheatpumpservice.offline_replay import create_offline_service
+from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+from synthetic_esdl import ARCHETYPES, create_energy_system
+
+DEFAULT_SIZES = [1, 100, 10000, 100000]
+FORECAST_HORIZON = 48
+START_TIME = datetime(2024, 1, 1)
+KERNEL_CALLS = 100000
+
+
+def create_weather_forecast(time_step_number: int, horizon: int = FORECAST_HORIZON, period_in_seconds: int = 900):
+    # Daily cycles of a winter day: air temperature between 0 and 8 degrees C with its maximum in the afternoon,
+    # solar irradiance on a half sine between 8:00 and 16:00 and a slowly varying soil temperature
+    hours = (time_step_number + np.arange(horizon)) * period_in_seconds / 3600.0
+    air_temperature = 277.15 + 4.0 * np.sin(2 * np.pi * (hours - 9.0) / 24.0)
+    solar_irradiance = np.clip(300.0 * np.sin(np.pi * (hours % 24 - 8.0) / 8.0), 0.0, None) * (hours % 24 >= 8.0)
+    soil_temperature = 283.15 + 0.1 * np.sin(2 * np.pi * hours / (24.0 * 365.0))
+    return {"solar_irradiance": solar_irradiance.tolist(),
+            "air_temperature": air_temperature.tolist(),
+            "soil_temperature": soil_temperature.tolist()}
+
+
+def call_statistics(call_seconds: list) -> dict:
+    call_seconds = np.array(call_seconds)
+    return {"mean_call_seconds": float(call_seconds.mean()),
+            "p50_call_seconds": float(np.percentile(call_seconds, 50)),
+            "p95_call_seconds": float(np.percentile(call_seconds, 95)),
+            "max_call_seconds": float(call_seconds.max())}
+
+
+def benchmark_kernels() -> dict:
+    building, hhp, _ = ARCHETYPES[0]
+    house = House({'C_in': building['C_in'], 'C_out': building['C_out']},
+                  {name: building[name] for name in ['R_exch', 'R_floor', 'R_vent', 'R_cond']}, building['A_glass'])
+    house.set_initial_temperatures(hhp['house_temp_0'], 9000.0, 277.15, 283.15, 0.0)
+    heat_buffer = HeatBuffer(hhp['buffer_capacitance'])
+    heat_buffer.set_initial_temperature(hhp['buffer_temp_0'])
+
+    house_seconds = min(timeit.repeat(lambda: house.update_temperatures(900, 277.15, 283.15, 120.0, 4000.0),
+                                      number=KERNEL_CALLS, repeat=3))
+    buffer_seconds = min(timeit.repeat(lambda: heat_buffer.update_temperature(900, 4000.0, 4000.0),
+                                       number=KERNEL_CALLS, repeat=3))
+    return {"house_update_temperatures_calls_per_second": KERNEL_CALLS / house_seconds,
+            "heat_buffer_update_temperature_calls_per_second": KERNEL_CALLS / buffer_seconds}
+
+
+def benchmark_size(number_of_houses: int, number_of_steps: int, number_of_workers: int) -> dict:
+    start = time.perf_counter()
+    energy_system, esdl_ids = create_energy_system(number_of_houses)
+    esdl_generation_seconds = time.perf_counter() - start
+
+    service = create_offline_service(esdl_ids, START_TIME, (number_of_steps + 1) * 900)
+    service.influx_connector = InfluxDBMock()
+    service.settings.number_of_worker_processes = number_of_workers
+
+    # Memory is traced in a separate run as tracing slows down the allocations
+    start = time.perf_counter()
+    service.init_calculation_service(energy_system)
+    init_seconds = time.perf_counter() - start
+    service.fleet.close()
+    tracemalloc.start()
+    service.init_calculation_service(energy_system)
+    _, init_peak_memory_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    period = service.hybridheatpump_period_in_seconds
+    send_call_seconds = []
+    update_call_seconds = []
+    send_step_seconds = []
+    update_step_seconds = []
+    for k in range(1, number_of_steps + 1):
+        time_step_information = TimeStepInformation(k, number_of_steps)
+        simulation_time = START_TIME + timedelta(seconds=k * period)
+        weather_params = create_weather_forecast(k)
+
+        step_start = time.perf_counter()
+        for esdl_id in esdl_ids:
+            call_start = time.perf_counter()
+            service.send_temperatures(weather_params, simulation_time, time_step_information, esdl_id, energy_system)
+            send_call_seconds.append(time.perf_counter() - call_start)
+        send_step_seconds.append(time.perf_counter() - step_start)
+
+        step_start = time.perf_counter()
+        for esdl_id, thermal_power in zip(esdl_ids, service.hhp_esdl_thermalpower):
+            param_dict = dict(weather_params, heat_power_to_buffer_hhp=0.5 * thermal_power, heat_power_to_house_hhp=0.5 * thermal_power)
+            call_start = time.perf_counter()
+            service.update_temperatures(param_dict, simulation_time, time_step_information, esdl_id, energy_system)
+            update_call_seconds.append(time.perf_counter() - call_start)
+        update_step_seconds.append(time.perf_counter() - step_start)
+        service.influx_connector.data_points.clear()
+
+    # The batched update of all houses without the per esdl_id calculations around it
+    fleet_step_seconds = min(timeit.repeat(lambda: service.fleet.step(period), number=10, repeat=3)) / 10
+    service.fleet.close()
+
+    return {"number_of_houses": number_of_houses,
+            "esdl_generation_seconds": esdl_generation_seconds,
+            "init_calculation_service_seconds": init_seconds,
+            "init_calculation_service_peak_memory_bytes": init_peak_memory_bytes,
+            "send_temperatures": dict(call_statistics(send_call_seconds), step_seconds=send_step_seconds),
+            "update_temperatures": dict(call_statistics(update_call_seconds), step_seconds=update_step_seconds),
+            "fleet_step_seconds": fleet_step_seconds,
+            "fleet_house_steps_per_second": number_of_houses / fleet_step_seconds}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hybrid heat pump service on synthetic energy systems")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0, help="number of fleet worker processes, 0 to step in the main process")
+    parser.add_argument("--output", help="JSON file to write the results to, printed when not given")
+    args = parser.parse_args()
+
+    LOGGER.setLevel(logging.WARNING)
+    results = {"metadata": {"time": datetime.now().isoformat(),
+                            "git_revision": git_revision(),
+                            "python": sys.version.split()[0],
+                            "numpy": np.__version__,
+                            "platform": platform.platform(),
+                            "steps": args.steps,
+                            "workers": args.workers},
+               "kernels": benchmark_kernels(),
+               "sizes": []}
+    for number_of_houses in args.sizes:
+        results["sizes"].append(benchmark_size(number_of_houses, args.steps, args.workers))
+        print(f"benchmarked {number_of_houses} houses", file=sys.stderr)
+    # Peak resident memory of the whole run, in kilobytes on Linux
+    results["metadata"]["max_rss_kilobytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Generator of synthetic energy systems with many buildings, each holding one hybrid heat pump.
+#
+#   python benchmarks/synthetic_esdl.py 10000 synthetic.esdl
+import json
+import sys
+import uuid
+from typing import List, Tuple
+
+import esdl
+from esdl.esdl_handler import EnergySystemHandler
+
+# (building description, hybrid heat pump description, thermal power) per archetype
+ARCHETYPES = [
+    ({'C_in': 26146400.0, 'C_out': 78439200.0, 'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+      'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074, 'A_glass': 31.39},
+     {'buffer_capacitance': 752940.0, 'buffer_temp_min': 298.15, 'buffer_temp_max': 338.15, 'buffer_temp_0': 315.93853596915767,
+      'house_temp_min': 290.84999999999997, 'house_temp_0': 291.8432403998078}, 9000.0),
+    ({'C_in': 18302480.0, 'C_out': 54907440.0, 'R_exch': 0.0016149068322981366, 'R_floor': 0.014537634409102370,
+      'R_vent': 0.020055971879254005, 'R_cond': 0.0034914924079085496, 'A_glass': 21.97},
+     {'buffer_capacitance': 527058.0, 'buffer_temp_min': 298.15, 'buffer_temp_max': 338.15, 'buffer_temp_0': 315.0,
+      'house_temp_min': 290.84999999999997, 'house_temp_0': 291.65}, 6000.0),
+    ({'C_in': 39219600.0, 'C_out': 117658800.0, 'R_exch': 0.0009316770186335404, 'R_floor': 0.008387096774482136,
+      'R_vent': 0.011570753007261926, 'R_cond': 0.0020143225430818556, 'A_glass': 47.08},
+     {'buffer_capacitance': 1129410.0, 'buffer_temp_min': 298.15, 'buffer_temp_max': 338.15, 'buffer_temp_0': 318.15,
+      'house_temp_min': 290.84999999999997, 'house_temp_0': 292.15}, 12000.0),
+]
+
+
+def create_esdl_string(number_of_houses: int) -> Tuple[str, List[str]]:
+    esh = EnergySystemHandler()
+    energy_system = esh.create_empty_energy_system("synthetic", "Synthetic hybrid heat pump neighbourhood", "Instance", "Area")
+    area = energy_system.instance[0].area
+    descriptions = [(json.dumps(building), json.dumps(hhp), power) for building, hhp, power in ARCHETYPES]
+
+    esdl_ids = []
+    for i in range(number_of_houses):
+        building_description, hhp_description, thermal_power = descriptions[i % len(descriptions)]
+        building = esdl.Building(id=str(uuid.uuid4()), name=f"Home{i}", description=building_description)
+        hhp = esdl.HybridHeatPump(id=str(uuid.uuid4()), name=f"hhp_Home{i}", description=hhp_description,
+                                  heatPumpThermalPower=thermal_power)
+        building.asset.append(hhp)
+        area.asset.append(building)
+        esdl_ids.append(hhp.id)
+
+    return esh.to_string(), esdl_ids
+
+
+def create_energy_system(number_of_houses: int) -> Tuple[esdl.EnergySystem, List[str]]:
+    # The energy system as loaded from its XML, so that it is indexed like an ESDL received by the service
+    esdl_string, esdl_ids = create_esdl_string(number_of_houses)
+    return EnergySystemHandler().load_from_string(esdl_string), esdl_ids
+
+
+def main():
+    esdl_string, _ = create_esdl_string(int(sys.argv[1]))
+    with open(sys.argv[2], "w") as esdl_file:
+        esdl_file.write(esdl_string)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import numpy as np
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from dots_infrastructure.DataClasses import EsdlId
+from dots_infrastructure.Logger import LOGGER
+from hybridheatpumpservice.descriptions import HybridHeatPumpDescription
+from hybridheatpumpservice.fleet import HouseFleet
+
+RAISE = "raise"  # raise a ValueError listing every house out of its bounds
+CLAMP = "clamp"  # move the temperatures back within the bounds and continue
+RECORD = "record"  # keep the temperatures, record the violation and continue
+BOUNDS_POLICIES = (RAISE, CLAMP, RECORD)
+
+# Temperatures closer than eps to a bound are moved eps inside it, to correct numerical errors
+BOUNDS_EPS = 1.0e-4
+
+
+class BoundsViolations(NamedTuple):
+    simulation_time: datetime
+    buffer_esdl_ids: List[EsdlId]
+    house_esdl_ids: List[EsdlId]
+
+
+class BoundsChecker:
+    # Checks the buffer and indoor temperatures of all houses against their bounds in one pass per step
+    def __init__(self, esdl_ids: List[EsdlId], hhp_descriptions: List[HybridHeatPumpDescription], policy: str = RAISE):
+        if policy not in BOUNDS_POLICIES:
+            raise ValueError(f"Unknown bounds policy {policy}, expected one of {BOUNDS_POLICIES}")
+        self.esdl_ids = np.array(esdl_ids, dtype=object)
+        self.buffer_temp_min = np.array([description.buffer_temp_min for description in hhp_descriptions], dtype=float)
+        self.buffer_temp_max = np.array([description.buffer_temp_max for description in hhp_descriptions], dtype=float)
+        self.house_temp_min = np.array([description.house_temp_min for description in hhp_descriptions], dtype=float)
+        self.policy = policy
+        # Aggregate counts over the run, the violations of each step are logged and not kept, see log_summary
+        self.number_of_violation_steps = 0
+        self.buffer_violation_counts = np.zeros(len(esdl_ids), dtype=int)
+        self.house_violation_counts = np.zeros(len(esdl_ids), dtype=int)
+
+    def correct_and_check(self, simulation_time: datetime, fleet: HouseFleet) -> Optional[BoundsViolations]:
+        # Returns the violations of this step, None when all houses are within their bounds
+        buffer_temperatures = fleet.buffer_temperatures
+        indoor_temperatures = fleet.house_temperatures[:, 0]
+
+        # Correct errors up till error eps, in place in the fleet state
+        buffer_temperatures[:] = np.where(np.abs(buffer_temperatures - self.buffer_temp_min) < BOUNDS_EPS,
+                                          self.buffer_temp_min + BOUNDS_EPS, buffer_temperatures)
+        buffer_temperatures[:] = np.where(np.abs(buffer_temperatures - self.buffer_temp_max) < BOUNDS_EPS,
+                                          self.buffer_temp_max - BOUNDS_EPS, buffer_temperatures)
+        indoor_temperatures[:] = np.where(np.abs(indoor_temperatures - self.house_temp_min) < BOUNDS_EPS,
+                                          self.house_temp_min + BOUNDS_EPS, indoor_temperatures)
+
+        buffer_violations = (buffer_temperatures < self.buffer_temp_min) | (buffer_temperatures > self.buffer_temp_max)
+        house_violations = indoor_temperatures < self.house_temp_min
+        if not (buffer_violations.any() or house_violations.any()):
+            return None
+
+        violations = BoundsViolations(simulation_time,
+                                      self.esdl_ids[buffer_violations].tolist(),
+                                      self.esdl_ids[house_violations].tolist())
+        if self.policy == RAISE:
+            raise ValueError(f"Hybrid heat pumps out of bounds at {simulation_time}: "
+                             f"{violations.buffer_esdl_ids} charged over/under their buffer capacity, "
+                             f"{violations.house_esdl_ids} charged under their house capacity")
+        if self.policy == CLAMP:
+            np.clip(buffer_temperatures, self.buffer_temp_min + BOUNDS_EPS, self.buffer_temp_max - BOUNDS_EPS,
+                    out=buffer_temperatures)
+            indoor_temperatures[:] = np.maximum(indoor_temperatures, self.house_temp_min + BOUNDS_EPS)
+        self.number_of_violation_steps += 1
+        self.buffer_violation_counts += buffer_violations
+        self.house_violation_counts += house_violations
+        LOGGER.warning("step %s: %d buffers out of bounds %s, %d houses under their lower bound %s, %s",
+                       simulation_time, len(violations.buffer_esdl_ids), violations.buffer_esdl_ids,
+                       len(violations.house_esdl_ids), violations.house_esdl_ids,
+                       "clamped" if self.policy == CLAMP else "continuing")
+        return violations
+
+    def worst_esdl_ids(self, violation_counts: np.array, number_of_houses: int) -> List[tuple]:
+        # (esdl id, number of steps out of bounds) of the houses with the most violations, most first
+        order = np.argsort(-violation_counts, kind="stable")[:number_of_houses]
+        return [(esdl_id, count) for esdl_id, count in zip(self.esdl_ids[order].tolist(), violation_counts[order].tolist()) if count > 0]
+
+    def log_summary(self, number_of_houses: int = 5):
+        if self.number_of_violation_steps == 0:
+            LOGGER.info("No hybrid heat pumps out of bounds during the run")
+            return
+        LOGGER.warning("%d steps with hybrid heat pumps out of bounds (%s), most buffer violations %s, most house violations %s",
+                       self.number_of_violation_steps, self.policy,
+                       self.worst_esdl_ids(self.buffer_violation_counts, number_of_houses),
+                       self.worst_esdl_ids(self.house_violation_counts, number_of_houses))
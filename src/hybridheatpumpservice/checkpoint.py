@@ -0,0 +1,58 @@
+import json
+import os
+import numpy as np
+from datetime import datetime
+from typing import List, NamedTuple
+
+from dots_infrastructure.DataClasses import EsdlId
+
+# A checkpoint at base path <path> is a sidecar <path>.json and the fleet state <path>.<time step>.npy it refers to.
+# The state file is written first and the sidecar replaces the previous one afterwards, so the sidecar always
+# refers to a complete state file.
+
+
+class Checkpoint(NamedTuple):
+    # Per house [indoor, outdoor, buffer] temperature (N x 3), memory-mapped read-only
+    state: np.array
+    esdl_ids: List[EsdlId]
+    time_step_number: int
+    simulation_time: datetime
+
+
+def replace_file(path: str, write):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as temporary_file:
+        write(temporary_file)
+        temporary_file.flush()
+        os.fsync(temporary_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def write_checkpoint(path: str, state: np.array, esdl_ids: List[EsdlId], time_step_number: int, simulation_time: datetime):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    state_file_name = f"{os.path.basename(path)}.{time_step_number:06d}.npy"
+    state_path = os.path.join(directory, state_file_name)
+    replace_file(state_path, lambda state_file: np.save(state_file, np.ascontiguousarray(state)))
+
+    previous_state_path = None
+    if os.path.exists(f"{path}.json"):
+        with open(f"{path}.json") as sidecar_file:
+            previous_state_path = os.path.join(directory, json.load(sidecar_file)["state_file"])
+    sidecar = {"state_file": state_file_name,
+               "time_step_number": time_step_number,
+               "simulation_time": simulation_time.isoformat(),
+               "esdl_ids": list(esdl_ids)}
+    replace_file(f"{path}.json", lambda sidecar_file: sidecar_file.write(json.dumps(sidecar).encode()))
+    if previous_state_path is not None and previous_state_path != state_path and os.path.exists(previous_state_path):
+        os.remove(previous_state_path)
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    with open(f"{path}.json") as sidecar_file:
+        sidecar = json.load(sidecar_file)
+    state = np.load(os.path.join(os.path.dirname(path), sidecar["state_file"]), mmap_mode="r")
+    if state.shape != (len(sidecar["esdl_ids"]), 3):
+        raise ValueError(f"Checkpoint {path} has a state of shape {state.shape} for {len(sidecar['esdl_ids'])} esdl ids")
+    return Checkpoint(state, sidecar["esdl_ids"], sidecar["time_step_number"], datetime.fromisoformat(sidecar["simulation_time"]))
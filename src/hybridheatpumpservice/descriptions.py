@@ -0,0 +1,82 @@
+import json
+import math
+from typing import Dict, NamedTuple, Optional
+
+from dots_infrastructure.DataClasses import EsdlId
+
+
+# Parameters read from the JSON description fields in the ESDL, fields not listed here are ignored
+class BuildingDescription(NamedTuple):
+    C_in: float
+    C_out: float
+    R_exch: float
+    R_floor: float
+    R_vent: float
+    R_cond: float
+    A_glass: float
+
+    def capacities(self) -> dict:
+        return {'C_in': self.C_in, 'C_out': self.C_out}
+
+    def resistances(self) -> dict:
+        return {'R_exch': self.R_exch, 'R_floor': self.R_floor, 'R_vent': self.R_vent, 'R_cond': self.R_cond}
+
+
+class HybridHeatPumpDescription(NamedTuple):
+    buffer_capacitance: float
+    buffer_temp_min: float
+    buffer_temp_max: float
+    buffer_temp_0: float
+    house_temp_min: float
+    house_temp_0: float
+
+
+POSITIVE_FIELDS = {'C_in', 'C_out', 'R_exch', 'R_floor', 'R_vent', 'R_cond', 'buffer_capacitance'}
+
+
+def parse_description_fields(description_type: type, description: str, parsed_descriptions: Optional[Dict] = None):
+    # Generated ESDLs repeat the same description strings for every archetype. With a parsed_descriptions memo,
+    # owned by the caller for the duration of one initialization, each string is parsed once.
+    if parsed_descriptions is not None:
+        key = (description_type, description)
+        parsed = parsed_descriptions.get(key)
+        if parsed is None:
+            parsed = parsed_descriptions[key] = parse_description_fields(description_type, description)
+        return parsed
+    if not description:
+        raise ValueError("description is missing")
+    try:
+        fields = json.loads(description)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"description is not valid JSON: {e}") from e
+    if not isinstance(fields, dict):
+        raise ValueError("description is not a JSON object")
+
+    missing_fields = [name for name in description_type._fields if name not in fields]
+    if missing_fields:
+        raise ValueError(f"description misses the fields {missing_fields}")
+
+    values = []
+    for name in description_type._fields:
+        value = fields[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"description field {name} should be a finite number but is {value!r}")
+        if name in POSITIVE_FIELDS and value <= 0:
+            raise ValueError(f"description field {name} should be positive but is {value!r}")
+        values.append(float(value))
+    return description_type(*values)
+
+
+def parse_building_description(description: str, esdl_id: EsdlId, parsed_descriptions: Optional[Dict] = None) -> BuildingDescription:
+    try:
+        return parse_description_fields(BuildingDescription, description, parsed_descriptions)
+    except ValueError as e:
+        raise ValueError(f"Building of hybrid heat pump {esdl_id} has an invalid {e}") from e
+
+
+def parse_hybrid_heat_pump_description(description: str, esdl_id: EsdlId,
+                                       parsed_descriptions: Optional[Dict] = None) -> HybridHeatPumpDescription:
+    try:
+        return parse_description_fields(HybridHeatPumpDescription, description, parsed_descriptions)
+    except ValueError as e:
+        raise ValueError(f"Hybrid heat pump {esdl_id} has an invalid {e}") from e
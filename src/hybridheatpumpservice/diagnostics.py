@@ -0,0 +1,55 @@
+import logging
+import numpy as np
+from datetime import datetime
+from typing import List, NamedTuple
+
+from dots_infrastructure.Logger import LOGGER
+from hybridheatpumpservice.descriptions import HybridHeatPumpDescription
+from hybridheatpumpservice.fleet import HouseFleet
+
+
+class StepSummary(NamedTuple):
+    number_of_houses: int
+    indoor_temperature_min: float
+    indoor_temperature_mean: float
+    indoor_temperature_max: float
+    outdoor_temperature_min: float
+    outdoor_temperature_mean: float
+    outdoor_temperature_max: float
+    buffer_temperature_min: float
+    buffer_temperature_mean: float
+    buffer_temperature_max: float
+    houses_near_lower_bound: int
+    buffers_near_bounds: int
+
+
+class FleetDiagnostics:
+    # Aggregates over all houses of the federate, logged as one line per time step instead of lines per house
+    def __init__(self, hhp_descriptions: List[HybridHeatPumpDescription], near_bound_margin: float):
+        self.house_temp_min = np.array([description.house_temp_min for description in hhp_descriptions], dtype=float)
+        self.buffer_temp_min = np.array([description.buffer_temp_min for description in hhp_descriptions], dtype=float)
+        self.buffer_temp_max = np.array([description.buffer_temp_max for description in hhp_descriptions], dtype=float)
+        self.near_bound_margin = near_bound_margin
+
+    def summarize(self, fleet: HouseFleet) -> StepSummary:
+        indoor_temperatures = fleet.house_temperatures[:, 0]
+        outdoor_temperatures = fleet.house_temperatures[:, 1]
+        buffer_temperatures = fleet.buffer_temperatures
+        houses_near_lower_bound = np.count_nonzero(indoor_temperatures - self.house_temp_min < self.near_bound_margin)
+        buffers_near_bounds = np.count_nonzero((buffer_temperatures - self.buffer_temp_min < self.near_bound_margin) |
+                                               (self.buffer_temp_max - buffer_temperatures < self.near_bound_margin))
+        return StepSummary(len(fleet),
+                           indoor_temperatures.min(), indoor_temperatures.mean(), indoor_temperatures.max(),
+                           outdoor_temperatures.min(), outdoor_temperatures.mean(), outdoor_temperatures.max(),
+                           buffer_temperatures.min(), buffer_temperatures.mean(), buffer_temperatures.max(),
+                           int(houses_near_lower_bound), int(buffers_near_bounds))
+
+    def log_step_summary(self, simulation_time: datetime, fleet: HouseFleet):
+        # The summary is only computed when it is logged
+        if not LOGGER.isEnabledFor(logging.INFO):
+            return
+        summary = self.summarize(fleet)
+        LOGGER.info("step %s: %d houses, indoor temperature min/mean/max %.2f/%.2f/%.2f K, "
+                    "outdoor temperature min/mean/max %.2f/%.2f/%.2f K, buffer temperature min/mean/max %.2f/%.2f/%.2f K, "
+                    "%d houses near their lower bound, %d buffers near their bounds",
+                    simulation_time, *summary)
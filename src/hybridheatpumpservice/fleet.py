@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Dict, List
+
+from dots_infrastructure.DataClasses import EsdlId
+from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+
+
+# Per house float fields of the fleet in one flat buffer, so that the buffer can be placed in shared memory:
+# state [indoor, outdoor, buffer] (N x 3), ambient temperatures [air, soil] (N x 2), solar irradiance, heat to house,
+# heat to buffer, buffer capacitance and the update coefficients (12 x N)
+FLEET_FLOATS_PER_HOUSE = 3 + 2 + 4 + 12
+
+
+def fleet_arrays(buffer: np.array, n: int):
+    state, ambient_temperatures, rest = np.split(buffer[:FLEET_FLOATS_PER_HOUSE * n], [3 * n, 5 * n])
+    solar_irradiance, heat_to_house, heat_to_buffer, buffer_capacitance, coefficients = np.split(rest, [n, 2 * n, 3 * n, 4 * n])
+    return (state.reshape(n, 3), ambient_temperatures.reshape(n, 2), solar_irradiance, heat_to_house, heat_to_buffer,
+            buffer_capacitance, coefficients.reshape(12, n))
+
+
+def update_house_temperatures(coefficients: np.array, house_temperatures: np.array, ambient_temperatures: np.array,
+                              solar_irradiance: np.array, heat_to_house: np.array):
+    # Batched form of House.update_temperatures with the same closed form coefficients and order of operations,
+    # so every house follows exactly the same arithmetic as the per-object update, also on a slice of the fleet
+    (a_ii, a_io, a_oi, a_oo,
+     b_air_i, b_soil_i, b_solar_i, b_heat_i,
+     b_air_o, b_soil_o, b_solar_o, b_heat_o) = coefficients
+    temp_in = house_temperatures[:, 0]
+    temp_out = house_temperatures[:, 1]
+    air_temperature = ambient_temperatures[:, 0]
+    soil_temperature = ambient_temperatures[:, 1]
+
+    new_temp_in = (a_ii * temp_in + a_io * temp_out) + (b_air_i * air_temperature + b_soil_i * soil_temperature +
+                                                        b_solar_i * solar_irradiance + b_heat_i * heat_to_house)
+    new_temp_out = (a_oi * temp_in + a_oo * temp_out) + (b_air_o * air_temperature + b_soil_o * soil_temperature +
+                                                         b_solar_o * solar_irradiance + b_heat_o * heat_to_house)
+    house_temperatures[:, 0] = new_temp_in
+    house_temperatures[:, 1] = new_temp_out
+
+
+def update_buffer_temperatures(time_step: float, buffer_temperatures: np.array, buffer_capacitance: np.array,
+                               heat_to_house: np.array, heat_to_buffer: np.array):
+    buffer_temperatures += (heat_to_buffer - heat_to_house) * time_step / buffer_capacitance
+
+
+class HouseFleet:
+    # Stacked state of all houses and heat buffers managed by one federate, so that a time step
+    # advances every house in one batched operation instead of once per esdl_id.
+    def __init__(self, esdl_ids: List[EsdlId], houses: List[House], heat_buffers: List[HeatBuffer],
+                 number_of_sub_steps: int = 1, buffer: np.array = None):
+        self.esdl_ids = list(esdl_ids)
+        self.index: Dict[EsdlId, int] = {esdl_id: i for i, esdl_id in enumerate(self.esdl_ids)}
+        self.houses = list(houses)
+        self.heat_buffers = list(heat_buffers)
+        n = len(self.esdl_ids)
+        if buffer is None:
+            buffer = np.empty(FLEET_FLOATS_PER_HOUSE * n)
+        self.buffer = buffer[:FLEET_FLOATS_PER_HOUSE * n]
+        (self.state, self.ambient_temperatures, self.solar_irradiance, self.heat_to_house, self.heat_to_buffer,
+         self.buffer_capacitance, self.coefficients) = fleet_arrays(buffer, n)
+
+        self.buffer_capacitance[:] = [heat_buffer.capacitance for heat_buffer in self.heat_buffers]
+        # Stacked HouseModel.update_coefficients per time step, 12 x N
+        self.update_coefficients_cache: Dict[float, np.array] = {}
+        self.coefficients_time_step = None
+
+        # State with per house [indoor, outdoor, buffer] temperature, NaN until initialized
+        self.state[:] = np.nan
+        self.house_temperatures = self.state[:, 0:2]
+        self.buffer_temperatures = self.state[:, 2]
+
+        # Inputs of the coming step, staged per esdl_id. A step is integrated in number_of_sub_steps equal sub-steps
+        # with their own ambient temperatures and solar irradiance and constant heat powers.
+        self.number_of_sub_steps = number_of_sub_steps
+        self.sub_step_ambient_temperatures = np.zeros((number_of_sub_steps, n, 2))
+        self.sub_step_solar_irradiance = np.zeros((number_of_sub_steps, n))
+        self.ambient_temperatures[:] = 0.0
+        self.solar_irradiance[:] = 0.0
+        self.heat_to_house[:] = 0.0
+        self.heat_to_buffer[:] = 0.0
+        self.staged = np.zeros(n, dtype=bool)
+
+    def __len__(self):
+        return len(self.esdl_ids)
+
+    def bind(self, esdl_id: EsdlId):
+        # Move the (initialized) state of the house and buffer into the fleet, both keep a view on their row
+        i = self.index[esdl_id]
+        house = self.houses[i]
+        self.house_temperatures[i] = house.temperatures
+        house.temperatures = self.house_temperatures[i]
+        self.heat_buffers[i].bind(self.buffer_temperatures, i)
+
+    def restore(self, esdl_ids: List[EsdlId], state: np.array):
+        # Set the state of all houses and buffers at once, e.g. from a checkpoint, instead of initializing them
+        if sorted(esdl_ids) != sorted(self.esdl_ids):
+            raise ValueError("The esdl ids of the state to restore differ from the esdl ids of the fleet")
+        for i, (house, heat_buffer) in enumerate(zip(self.houses, self.heat_buffers)):
+            house.temperatures = self.house_temperatures[i]
+            heat_buffer.bind(self.buffer_temperatures, i)
+        self.state[[self.index[esdl_id] for esdl_id in esdl_ids]] = state
+
+    def move_to_buffer(self, buffer: np.array):
+        # Copy the fleet into another buffer, the houses and heat buffers bound to the fleet move along
+        n = len(self)
+        old_state = self.state
+        old_buffer_temperatures = self.buffer_temperatures
+        buffer[:FLEET_FLOATS_PER_HOUSE * n] = self.buffer
+        self.buffer = buffer[:FLEET_FLOATS_PER_HOUSE * n]
+        (self.state, self.ambient_temperatures, self.solar_irradiance, self.heat_to_house, self.heat_to_buffer,
+         self.buffer_capacitance, self.coefficients) = fleet_arrays(self.buffer, n)
+        self.house_temperatures = self.state[:, 0:2]
+        self.buffer_temperatures = self.state[:, 2]
+        for i, (house, heat_buffer) in enumerate(zip(self.houses, self.heat_buffers)):
+            if np.may_share_memory(house.temperatures, old_state):
+                house.temperatures = self.house_temperatures[i]
+            if heat_buffer.state is old_buffer_temperatures:
+                heat_buffer.state = self.buffer_temperatures
+
+    def stage_inputs(self, esdl_id: EsdlId, air_temperature, soil_temperature, solar_irradiance,
+                     heat_to_house: float, heat_to_buffer: float):
+        # The weather inputs are a value for the whole step or a sequence with a value per sub-step
+        i = self.index[esdl_id]
+        if np.isnan(self.buffer_temperatures[i]):
+            raise ValueError(f"Hybrid Heat pump {esdl_id} is updated before its temperatures are initialized")
+        self.sub_step_ambient_temperatures[:, i, 0] = air_temperature
+        self.sub_step_ambient_temperatures[:, i, 1] = soil_temperature
+        self.sub_step_solar_irradiance[:, i] = solar_irradiance
+        self.heat_to_house[i] = heat_to_house
+        self.heat_to_buffer[i] = heat_to_buffer
+        self.staged[i] = True
+
+    def all_inputs_staged(self) -> bool:
+        return bool(self.staged.all())
+
+    def update_coefficients(self, time_step: float):
+        if time_step not in self.update_coefficients_cache:
+            coefficients = np.array([house.model.update_coefficients(time_step) for house in self.houses]).reshape(len(self), 12)
+            self.update_coefficients_cache[time_step] = np.ascontiguousarray(coefficients.T)
+        return self.update_coefficients_cache[time_step]
+
+    def load_coefficients(self, time_step: float):
+        # Coefficients of the time step in the fleet buffer, where the step reads them
+        if time_step != self.coefficients_time_step:
+            self.coefficients[:] = self.update_coefficients(time_step)
+            self.coefficients_time_step = time_step
+
+    def step(self, time_step: float):
+        sub_time_step = time_step / self.number_of_sub_steps
+        for sub_step in range(self.number_of_sub_steps):
+            self.ambient_temperatures[:] = self.sub_step_ambient_temperatures[sub_step]
+            self.solar_irradiance[:] = self.sub_step_solar_irradiance[sub_step]
+            self.advance(sub_time_step)
+        self.staged[:] = False
+
+    def advance(self, time_step: float):
+        self.update_houses(time_step)
+        self.update_buffers(time_step)
+
+    def update_houses(self, time_step: float):
+        self.load_coefficients(time_step)
+        update_house_temperatures(self.coefficients, self.house_temperatures, self.ambient_temperatures,
+                                  self.solar_irradiance, self.heat_to_house)
+
+    def update_buffers(self, time_step: float):
+        update_buffer_temperatures(time_step, self.buffer_temperatures, self.buffer_capacitance,
+                                   self.heat_to_house, self.heat_to_buffer)
+
+    def close(self):
+        pass
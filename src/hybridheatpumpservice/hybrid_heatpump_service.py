@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime
+from datetime import datetime, timedelta
 from esdl import esdl
 import helics as h
 from dots_infrastructure.DataClasses import EsdlId, HelicsCalculationInformation, PublicationDescription, SubscriptionDescription, TimeStepInformation, TimeRequestType
@@ -8,14 +8,26 @@ from dots_infrastructure.Logger import LOGGER
 from esdl import EnergySystem
 from dots_infrastructure.CalculationServiceHelperFunctions import get_single_param_with_name
 
-import json
+import logging
 import numpy as np
-from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+from hybridheatpumpservice.thermalsystems import House, HouseModels, HeatBuffer
+from hybridheatpumpservice.fleet import HouseFleet
+from hybridheatpumpservice.sharding import ShardedHouseFleet
+from hybridheatpumpservice.descriptions import HybridHeatPumpDescription, parse_building_description, parse_hybrid_heat_pump_description
+from hybridheatpumpservice.influx_output import InfluxOutputBuffer
+from hybridheatpumpservice.diagnostics import FleetDiagnostics
+from hybridheatpumpservice.bounds import BoundsChecker
+from hybridheatpumpservice.publication import AGGREGATED_MANIFEST_OUTPUT, AGGREGATED_PUBLICATIONS, AGGREGATED_TEMPERATURES_OUTPUT, AggregatedValueFederateExecutor, pack_manifest, pack_temperatures
+from hybridheatpumpservice.checkpoint import read_checkpoint, write_checkpoint
+from hybridheatpumpservice.instrumentation import Instrumentation
+from hybridheatpumpservice.settings import get_settings_from_environment
 
 class CalculationServiceHybridHeatPump(HelicsSimulationExecutor):
 
     def __init__(self):
         super().__init__()
+        self.settings = get_settings_from_environment()
+        self.instrumentation = Instrumentation(self.settings.instrumentation)
 
         subscriptions_values = [
             SubscriptionDescription(esdl_type="EnvironmentalProfiles",
@@ -44,8 +56,21 @@ class CalculationServiceHybridHeatPump(HelicsSimulationExecutor):
                                    output_unit="K",
                                    data_type=h.HelicsDataType.VECTOR)
         ]
-
-        hybridheatpump_period_in_seconds = 900
+        # The free floating forecast is 4 x horizon values per house and step, so it is only published on request
+        if self.settings.free_float_forecast:
+            publication_values.append(PublicationDescription(global_flag=True,
+                                                             esdl_type="HybridHeatPump",
+                                                             output_name="predicted_house_temperatures_free_float",
+                                                             output_unit="K",
+                                                             data_type=h.HelicsDataType.VECTOR))
+        # Optionally the buffer and house temperatures of all houses are published as one message per step
+        if self.settings.aggregated_publication:
+            publication_values = [publication for publication in publication_values
+                                  if publication.output_name not in ("buffer_temperature", "house_temperatures")]
+            publication_values += AGGREGATED_PUBLICATIONS
+
+        # The exchange period of both calculations, the state is integrated in sub-steps of the internal time step
+        hybridheatpump_period_in_seconds = self.settings.period_in_seconds
         self.hybridheatpump_period_in_seconds = hybridheatpump_period_in_seconds
 
         calculation_information = HelicsCalculationInformation(
@@ -84,162 +109,252 @@ class CalculationServiceHybridHeatPump(HelicsSimulationExecutor):
                                     input_type=h.HelicsDataType.DOUBLE)
         ]
 
-        hybridheatpump_update_period_in_seconds = 900
+        hybridheatpump_update_period_in_seconds = hybridheatpump_period_in_seconds
 
         calculation_information_update = HelicsCalculationInformation(hybridheatpump_update_period_in_seconds, 0, False, False, True, "update_temperatures", subscriptions_values, [], self.update_temperatures)
         self.add_calculation(calculation_information_update)
 
+    def add_calculation(self, info: HelicsCalculationInformation):
+        # The base executor registers and publishes every output once per esdl id. A calculation with aggregated
+        # outputs needs an executor that registers those once per federate, so its executor is replaced after the
+        # base class has completed the calculation information (time request type and federate period).
+        super().add_calculation(info)
+        aggregated_names = [description.output_name for description in AGGREGATED_PUBLICATIONS]
+        if any(output.output_name in aggregated_names for output in info.outputs):
+            index = next(i for i, calculation in enumerate(self.calculations) if calculation.helics_value_federate_info is info)
+            self.calculations[index] = AggregatedValueFederateExecutor(info)
+
     def init_calculation_service(self, energy_system: esdl.EnergySystem):
         LOGGER.info("init calculation service")
-        self.hhp_description_dicts: dict[EsdlId, dict[str, float]] = {}
-        self.hhp_esdl_thermalpower: dict[EsdlId, float] = {}
-
-        self.heat_buffers: dict[EsdlId, HeatBuffer] = {}
-        self.houses: dict[EsdlId, House] = {}
-
-        self.inv_capacitance_matrices: dict[EsdlId, np.array] = {}
-        self.conductance_matrices: dict[EsdlId, np.array] = {}
-        self.forcing_matrices: dict[EsdlId, np.array] = {}
-        for obj in energy_system.eAllContents():
-            if hasattr(obj, "id") and isinstance(obj.eContainer(), esdl.Building) and obj.id in self.simulator_configuration.esdl_ids:
-                esdl_id = obj.id
-                hhpsystem = obj
-                building_description = json.loads(obj.eContainer().description)
-                self.hhp_description_dicts[esdl_id] = json.loads(hhpsystem.description)
-                self.hhp_esdl_thermalpower[esdl_id] = hhpsystem.heatPumpThermalPower
-
-                # Set Buffer Tank
-                buffer_capacitance = self.hhp_description_dicts[esdl_id]['buffer_capacitance']
-                self.heat_buffers[esdl_id] = HeatBuffer(buffer_capacitance)
-
-                # Set Houses
-                capacities = {'C_in': building_description['C_in'], 'C_out': building_description['C_out']}
-                resistances = {'R_exch': building_description['R_exch'], 'R_floor': building_description['R_floor'],
-                               'R_vent': building_description['R_vent'], 'R_cond': building_description['R_cond']}
-                window_area = building_description['A_glass']
-                self.houses[esdl_id] = House(capacities, resistances, window_area)
+        timer = self.instrumentation.timer("init_calculation_service")
+        hhp_assets = self.find_hybrid_heat_pumps(energy_system)
+        timer.lap("find_hybrid_heat_pumps")
+
+        # Houses are stored by an integer index (self.esdl_index) in the order of the simulator configuration
+        fleet_esdl_ids = list(hhp_assets.keys())
+        self.hhp_descriptions: list[HybridHeatPumpDescription] = []
+        self.hhp_esdl_thermalpower: list[float] = []
+        heat_buffers: list[HeatBuffer] = []
+        houses: list[House] = []
+        # Houses with equal building parameters share their model matrices
+        self.house_models = HouseModels()
+        # Repeated description strings are parsed once, the memo is dropped after the initialization
+        parsed_descriptions = {}
+        for esdl_id, hhpsystem in hhp_assets.items():
+            building_description = parse_building_description(hhpsystem.eContainer().description, esdl_id, parsed_descriptions)
+            hhp_description = parse_hybrid_heat_pump_description(hhpsystem.description, esdl_id, parsed_descriptions)
+            self.hhp_descriptions.append(hhp_description)
+            self.hhp_esdl_thermalpower.append(hhpsystem.heatPumpThermalPower)
+
+            # Set Buffer Tank
+            heat_buffers.append(HeatBuffer(hhp_description.buffer_capacitance))
+
+            # Set Houses
+            houses.append(House(building_description.capacities(), building_description.resistances(),
+                                building_description.A_glass, self.settings.integration_method, self.house_models))
+        timer.lap("create_houses")
+
+        # Optionally the houses are advanced by worker processes, the HELICS exchange stays in this process
+        number_of_sub_steps = self.settings.number_of_sub_steps
+        if self.settings.number_of_worker_processes > 0:
+            self.fleet = ShardedHouseFleet(fleet_esdl_ids, houses, heat_buffers, self.settings.number_of_worker_processes,
+                                           number_of_sub_steps)
+        else:
+            self.fleet = HouseFleet(fleet_esdl_ids, houses, heat_buffers, number_of_sub_steps)
+        # Index in the received forecast vectors of the weather during each sub-step
+        sub_step_times = np.arange(number_of_sub_steps) * self.settings.internal_time_step_in_seconds
+        self.sub_step_forecast_indices = np.floor(sub_step_times / self.settings.forecast_time_step_in_seconds).astype(int).tolist()
+        self.esdl_index = self.fleet.index
+        self.fleet_manifest = pack_manifest(fleet_esdl_ids)
+        self.influx_output = InfluxOutputBuffer(fleet_esdl_ids,
+                                                self.settings.influx_flush_size,
+                                                self.settings.influx_flush_interval_in_seconds,
+                                                self.settings.influx_extended_outputs)
+        self.diagnostics = FleetDiagnostics(self.hhp_descriptions, self.settings.diagnostics_near_bound_margin)
+        self.bounds = BoundsChecker(fleet_esdl_ids, self.hhp_descriptions, self.settings.bounds_policy)
+        timer.lap("create_fleet")
+
+        # Start from the temperatures of a checkpoint instead of the initial temperatures of the descriptions
+        self.restored_time_step_number = 0
+        if self.settings.restore_checkpoint_path:
+            checkpoint = read_checkpoint(self.settings.restore_checkpoint_path)
+            self.fleet.restore(checkpoint.esdl_ids, checkpoint.state)
+            self.restored_time_step_number = checkpoint.time_step_number
+            LOGGER.info("Restored %d hybrid heat pumps from checkpoint %s at time step %d (%s)", len(checkpoint.esdl_ids),
+                        self.settings.restore_checkpoint_path, checkpoint.time_step_number, checkpoint.simulation_time)
+            timer.lap("restore_checkpoint")
+        timer.stop()
+        if self.instrumentation.enabled:
+            self.instrumentation.record_peak_memory("init_calculation_service")
+
+    def find_hybrid_heat_pumps(self, energy_system: esdl.EnergySystem) -> dict[EsdlId, esdl.HybridHeatPump]:
+        # Look the configured esdl ids up in the id index of the loaded resource instead of walking the whole tree
+        esdl_ids = self.simulator_configuration.esdl_ids
+        uuid_dict = getattr(energy_system.eResource, "uuid_dict", None)
+        if uuid_dict:
+            candidates = (uuid_dict.get(esdl_id) for esdl_id in esdl_ids)
+        else:
+            esdl_id_set = set(esdl_ids)
+            candidates = (obj for obj in energy_system.eAllContents() if isinstance(obj, esdl.HybridHeatPump) and obj.id in esdl_id_set)
 
+        hhp_assets_by_id = {obj.id: obj for obj in candidates
+                            if isinstance(obj, esdl.HybridHeatPump) and isinstance(obj.eContainer(), esdl.Building)}
+        missing_esdl_ids = [esdl_id for esdl_id in esdl_ids if esdl_id not in hhp_assets_by_id]
+        if missing_esdl_ids:
+            raise ValueError(f"esdl ids {missing_esdl_ids} are not hybrid heat pumps inside a building in the energy system")
+        return {esdl_id: hhp_assets_by_id[esdl_id] for esdl_id in esdl_ids}
 
     def send_temperatures(self, param_dict : dict, simulation_time : datetime, time_step_number : TimeStepInformation, esdl_id : EsdlId, energy_system : EnergySystem):
         # START user calc
-        LOGGER.info("calculation 'send_temperatures' started")
+        LOGGER.debug("calculation 'send_temperatures' started for %s", esdl_id)
+        timer = self.instrumentation.timer("send_temperatures")
 
         predicted_solar_irradiances = get_single_param_with_name(param_dict, "solar_irradiance")
         predicted_air_temperatures = get_single_param_with_name(param_dict, "air_temperature")
         predicted_soil_temperatures = get_single_param_with_name(param_dict, "soil_temperature")
+        timer.lap("fetch_inputs")
 
         # Check if the house and tank temperatures are properly initialized
-        house = self.houses[esdl_id]
-        heat_buffer = self.heat_buffers[esdl_id]
+        index = self.esdl_index[esdl_id]
+        house = self.fleet.houses[index]
+        heat_buffer = self.fleet.heat_buffers[index]
         if (house.temperatures is None) or (heat_buffer.temperature is None):
             current_solar_irradiance = predicted_solar_irradiances[0]
             current_air_temperature  = predicted_air_temperatures[0]
             current_soil_temperature = predicted_soil_temperatures[0]
 
-            hhp_description_dict = self.hhp_description_dicts[esdl_id]
+            hhp_description = self.hhp_descriptions[index]
 
-            heat_buffer.set_initial_temperature(hhp_description_dict['buffer_temp_0'])
-            house.set_initial_temperatures(hhp_description_dict['house_temp_0'],
-                                           self.hhp_esdl_thermalpower[esdl_id],
+            heat_buffer.set_initial_temperature(hhp_description.buffer_temp_0)
+            house.set_initial_temperatures(hhp_description.house_temp_0,
+                                           self.hhp_esdl_thermalpower[index],
                                            current_air_temperature,
                                            current_soil_temperature,
                                            current_solar_irradiance)
-
-            self.heat_buffers[esdl_id] = heat_buffer
-            self.houses[esdl_id] = house
-
-            house_temperatures_list = house.temperatures.tolist()
-        else:
-            house_temperatures_list = house.temperatures.tolist()
-
-
+            self.fleet.bind(esdl_id)
+            timer.lap("initialize")
 
         ret_val = {}
-        ret_val["buffer_temperature"]   = heat_buffer.temperature
-        ret_val["house_temperatures"]   = house_temperatures_list
-
-        LOGGER.debug(f"buffer temperature: {heat_buffer.temperature}, house temperatures: {house.temperatures}")
-
-        LOGGER.info("calculation 'send_temperatures' finished")
+        if not self.settings.aggregated_publication:
+            ret_val["buffer_temperature"]   = heat_buffer.temperature
+            ret_val["house_temperatures"]   = house.temperatures.tolist()
+        elif esdl_id == self.simulator_configuration.esdl_ids[-1]:
+            # The executor calculates the esdl ids in order, so all houses are initialized at the last one
+            ret_val[AGGREGATED_TEMPERATURES_OUTPUT] = pack_temperatures(self.fleet.state)
+            ret_val[AGGREGATED_MANIFEST_OUTPUT] = self.fleet_manifest
+
+        if self.settings.free_float_forecast:
+            # Free floating trajectory over the forecast horizon followed by the response to 1 W heat in the first step:
+            # [indoor temperatures, outdoor temperatures, indoor unit heat response, outdoor unit heat response]
+            forecast_time_step = self.settings.forecast_time_step_in_seconds
+            predicted_temperatures = house.predict_free_float_temperatures(forecast_time_step,
+                                                                           predicted_air_temperatures,
+                                                                           predicted_soil_temperatures,
+                                                                           predicted_solar_irradiances)
+            unit_heat_response = house.unit_heat_response(forecast_time_step, len(predicted_temperatures))
+            timer.lap("predict")
+            ret_val["predicted_house_temperatures_free_float"] = np.concatenate([predicted_temperatures.T.ravel(),
+                                                                                 unit_heat_response.T.ravel()]).tolist()
+        timer.lap("outputs")
+
+        LOGGER.debug("calculation 'send_temperatures' finished for %s, buffer temperature: %s, house temperatures: %s",
+                     esdl_id, heat_buffer.temperature, house.temperatures)
+        timer.stop()
         # END user calc
         return ret_val
 
     def update_temperatures(self, param_dict : dict, simulation_time : datetime, time_step_number : TimeStepInformation, esdl_id : EsdlId, energy_system : EnergySystem):
         # START user calc
-        LOGGER.info("calculation 'update_temperatures' started")
+        LOGGER.debug("calculation 'update_temperatures' started for %s", esdl_id)
+        timer = self.instrumentation.timer("update_temperatures")
         predicted_solar_irradiances = get_single_param_with_name(param_dict, "solar_irradiance")
         predicted_air_temperatures = get_single_param_with_name(param_dict, "air_temperature")
         predicted_soil_temperatures = get_single_param_with_name(param_dict, "soil_temperature")
         heat_to_buffer = get_single_param_with_name(param_dict, "heat_power_to_buffer_hhp")
         heat_to_house = get_single_param_with_name(param_dict,"heat_power_to_house_hhp")
-
-        current_air_temperature = predicted_air_temperatures[0]
-        current_soil_temperature = predicted_soil_temperatures[0]
-        current_solar_irradiance = predicted_solar_irradiances[0]
-
-        heat_buffer = self.heat_buffers[esdl_id]
-        house = self.houses[esdl_id]
-
-        LOGGER.info(f"esdl id: {esdl_id}")
-        LOGGER.info(f"house temperatures before: {house.temperatures}")
-        LOGGER.info(f"buffer temperature before: {heat_buffer.temperature}")
-        LOGGER.info(f"heat to house: {heat_to_house}")
-        LOGGER.info(f"heat to buffer: {heat_to_buffer}")
-
-        # Update temperatures
-        house.update_temperatures(self.hybridheatpump_period_in_seconds,
-                                  current_air_temperature,
-                                  current_soil_temperature,
-                                  current_solar_irradiance,
-                                  heat_to_house)
-        heat_buffer.update_temperature(self.hybridheatpump_period_in_seconds,
-                                       heat_to_house,
-                                       heat_to_buffer)
-
-        LOGGER.info(f"house temperatures after: {house.temperatures}")
-        LOGGER.info(f"buffer temperature after: {heat_buffer.temperature}")
-
-        house_temperatures = house.temperatures
-        heat_buffer_temperature = heat_buffer.temperature
-
-        # Check whether temperatures did not surpass the limits due to some numerical error
-        lower_bound_buffer = self.hhp_description_dicts[esdl_id]['buffer_temp_min']
-        upper_bound_buffer = self.hhp_description_dicts[esdl_id]['buffer_temp_max']
-        lower_bound_house = self.hhp_description_dicts[esdl_id]['house_temp_min']
-
-        # Correct errors up till error eps
-        eps = 1.0e-4
-        if abs(heat_buffer_temperature - lower_bound_buffer) < eps:
-            heat_buffer_temperature = lower_bound_buffer + eps
-        if abs(heat_buffer_temperature - upper_bound_buffer) < eps:
-            heat_buffer_temperature = upper_bound_buffer - eps
-        if abs(house_temperatures[0] - lower_bound_house) < eps:
-            house_temperatures[0] = lower_bound_house + eps
-
-        # Raise errors if the values are still not within boundaries
-        if (heat_buffer_temperature < lower_bound_buffer) or (heat_buffer_temperature > upper_bound_buffer):
-            raise ValueError(
-                f"Hybrid Heat pump {esdl_id} is charged over/under its buffer capacity")
-        if house_temperatures[0] < lower_bound_house:
-            LOGGER.info(
-                f"Hybrid Heat pump {esdl_id} is charged over/under its house capacity")
-            raise ValueError(
-                f"Hybrid Heat pump {esdl_id} is charged over/under its house capacity")
-
-        # Save as state
-        house.temperatures = house_temperatures
-        heat_buffer.temperature = heat_buffer_temperature
-        self.houses[esdl_id] = house
-        self.heat_buffers[esdl_id] = heat_buffer
-
-        self.influx_connector.set_time_step_data_point(esdl_id, 'buffer_temperature',
-                                                      simulation_time, heat_buffer_temperature)
-        self.influx_connector.set_time_step_data_point(esdl_id, 'house_temperature',
-                                                      simulation_time, house_temperatures[0])
-        LOGGER.info("calculation 'update_temperatures' finished")
+        timer.lap("fetch_inputs")
+
+        # Weather during each sub-step of the period, held from the forecast step it falls in
+        last_forecast_index = len(predicted_air_temperatures) - 1
+        forecast_indices = [min(index, last_forecast_index) for index in self.sub_step_forecast_indices]
+        sub_step_air_temperatures = [predicted_air_temperatures[index] for index in forecast_indices]
+        sub_step_soil_temperatures = [predicted_soil_temperatures[index] for index in forecast_indices]
+        sub_step_solar_irradiances = [predicted_solar_irradiances[index] for index in forecast_indices]
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            index = self.esdl_index[esdl_id]
+            LOGGER.debug("esdl id: %s, house temperatures before: %s, buffer temperature before: %s, heat to house: %s, heat to buffer: %s",
+                         esdl_id, self.fleet.houses[index].temperatures, self.fleet.heat_buffers[index].temperature,
+                         heat_to_house, heat_to_buffer)
+            timer.lap("logging")
+
+        # Stage the inputs, once all houses of this federate have their inputs they are updated in one batch
+        self.fleet.stage_inputs(esdl_id,
+                                sub_step_air_temperatures,
+                                sub_step_soil_temperatures,
+                                sub_step_solar_irradiances,
+                                heat_to_house,
+                                heat_to_buffer)
+        timer.lap("stage_inputs")
+        if self.fleet.all_inputs_staged():
+            self.fleet.step(self.hybridheatpump_period_in_seconds)
+            timer.lap("fleet_step")
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                for updated_esdl_id, house_temperatures, buffer_temperature in zip(self.fleet.esdl_ids, self.fleet.house_temperatures, self.fleet.buffer_temperatures):
+                    LOGGER.debug("esdl id: %s, house temperatures after: %s, buffer temperature after: %s",
+                                 updated_esdl_id, house_temperatures, buffer_temperature)
+                timer.lap("logging")
+            # Check whether temperatures did not surpass the limits due to some numerical error
+            self.bounds.correct_and_check(simulation_time, self.fleet)
+            timer.lap("bounds_check")
+            self.influx_output.record_step(self.influx_connector,
+                                           simulation_time,
+                                           self.fleet.buffer_temperatures,
+                                           self.fleet.house_temperatures,
+                                           self.fleet.heat_to_house,
+                                           self.fleet.heat_to_buffer)
+            timer.lap("influx_output")
+            if self.settings.diagnostics_step_summary:
+                self.diagnostics.log_step_summary(simulation_time, self.fleet)
+                timer.lap("diagnostics")
+            # The executor counts the time steps from the start of this run, which continues after a restored checkpoint
+            checkpoint_interval = self.settings.checkpoint_interval_in_time_steps
+            checkpoint_time_step_number = self.restored_time_step_number + time_step_number.current_time_step_number
+            if checkpoint_interval > 0 and checkpoint_time_step_number % checkpoint_interval == 0:
+                write_checkpoint(self.settings.checkpoint_path, self.fleet.state, self.fleet.esdl_ids,
+                                 checkpoint_time_step_number, simulation_time)
+                timer.lap("checkpoint")
+
+        LOGGER.debug("calculation 'update_temperatures' finished for %s", esdl_id)
+        timer.stop()
         # ret_val = {}
         return None
 
+    def stop_simulation(self):
+        # Wait for the calculations to finish and write the outputs that are still buffered, the fleet and its
+        # output buffer only exist once init_calculation_service has run
+        self.exe.shutdown()
+        influx_output = getattr(self, "influx_output", None)
+        if influx_output is not None:
+            influx_output.flush(self.influx_connector)
+        bounds = getattr(self, "bounds", None)
+        if bounds is not None:
+            bounds.log_summary()
+        if self.instrumentation.enabled:
+            self.write_instrumentation()
+        fleet = getattr(self, "fleet", None)
+        if fleet is not None:
+            fleet.close()
+        super().stop_simulation()
+
+    def write_instrumentation(self):
+        self.instrumentation.record_peak_memory("stop_simulation")
+        self.instrumentation.write(self.settings.instrumentation_path)
+        LOGGER.info("Wrote the instrumentation of %s to %s", self.simulator_configuration.model_id, self.settings.instrumentation_path)
+        if self.settings.instrumentation_influx:
+            end_time = self.simulator_configuration.start_time + timedelta(seconds=self.simulator_configuration.simulation_duration_in_seconds)
+            self.instrumentation.write_to_influx(self.influx_connector, end_time)
+
 if __name__ == "__main__":
 
     helics_simulation_executor = CalculationServiceHybridHeatPump()
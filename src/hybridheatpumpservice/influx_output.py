@@ -0,0 +1,53 @@
+import time
+import numpy as np
+from datetime import datetime
+from typing import List
+
+from dots_infrastructure.DataClasses import EsdlId
+from dots_infrastructure.influxdb_connector import InfluxDBConnector
+
+OUTPUT_NAMES = ['buffer_temperature', 'house_temperature']
+EXTENDED_OUTPUT_NAMES = ['house_outdoor_temperature', 'heat_power_to_house', 'heat_power_to_buffer']
+
+
+class InfluxOutputBuffer:
+    # Collects the outputs of all houses per time step in columnar blocks (outputs x houses) and writes them to the
+    # influx connector in bulk once flush_size points are buffered or flush_interval_in_seconds has passed.
+    def __init__(self, esdl_ids: List[EsdlId], flush_size: int = 0, flush_interval_in_seconds: float = 0.0,
+                 record_extended_outputs: bool = False):
+        self.esdl_ids = list(esdl_ids)
+        self.output_names = OUTPUT_NAMES + (EXTENDED_OUTPUT_NAMES if record_extended_outputs else [])
+        self.record_extended_outputs = record_extended_outputs
+        self.flush_size = flush_size
+        self.flush_interval_in_seconds = flush_interval_in_seconds
+
+        self.simulation_times: List[datetime] = []
+        self.blocks: List[np.array] = []
+        self.last_flush_time = time.monotonic()
+
+    def buffered_points(self) -> int:
+        return len(self.blocks) * len(self.output_names) * len(self.esdl_ids)
+
+    def record_step(self, influx_connector: InfluxDBConnector, simulation_time: datetime, buffer_temperatures: np.array,
+                    house_temperatures: np.array, heat_to_house: np.array, heat_to_buffer: np.array):
+        # house_temperatures is N x 2 with the indoor and outdoor temperature
+        columns = [buffer_temperatures, house_temperatures[:, 0]]
+        if self.record_extended_outputs:
+            columns += [house_temperatures[:, 1], heat_to_house, heat_to_buffer]
+        self.simulation_times.append(simulation_time)
+        self.blocks.append(np.array(columns))
+
+        flush_interval_passed = self.flush_interval_in_seconds > 0 and \
+            time.monotonic() - self.last_flush_time >= self.flush_interval_in_seconds
+        if self.buffered_points() >= self.flush_size or flush_interval_passed:
+            self.flush(influx_connector)
+
+    def flush(self, influx_connector: InfluxDBConnector):
+        for simulation_time, block in zip(self.simulation_times, self.blocks):
+            values_per_house = block.T.tolist()
+            for esdl_id, values in zip(self.esdl_ids, values_per_house):
+                for output_name, value in zip(self.output_names, values):
+                    influx_connector.set_time_step_data_point(esdl_id, output_name, simulation_time, value)
+        self.simulation_times.clear()
+        self.blocks.clear()
+        self.last_flush_time = time.monotonic()
@@ -0,0 +1,117 @@
+import bisect
+import json
+import resource
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from dots_infrastructure.influxdb_connector import InfluxDBConnector
+
+# Upper bounds of the latency histogram buckets of the calculation calls, the last bucket counts the slower calls
+LATENCY_BUCKET_BOUNDS_IN_SECONDS = [1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4,
+                                    1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0]
+
+
+class PhaseStatistics:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def report(self) -> dict:
+        return {"count": self.count,
+                "total_seconds": self.total_seconds,
+                "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+                "max_seconds": self.max_seconds}
+
+
+class PhaseTimer:
+    # Times the consecutive phases of one calculation call, every lap ends a phase and starts the next
+    __slots__ = ('instrumentation', 'calculation', 'call_start', 'phase_start')
+
+    def __init__(self, instrumentation: "Instrumentation", calculation: str):
+        self.instrumentation = instrumentation
+        self.calculation = calculation
+        self.call_start = self.phase_start = time.perf_counter()
+
+    def lap(self, phase: str):
+        self.phase_start = self.instrumentation.record_phase(f"{self.calculation}.{phase}", self.phase_start)
+
+    def stop(self):
+        self.instrumentation.record_call(self.calculation, self.call_start)
+
+
+class NoOpTimer:
+    __slots__ = ()
+
+    def lap(self, phase: str):
+        pass
+
+    def stop(self):
+        pass
+
+
+NO_OP_TIMER = NoOpTimer()
+
+
+class Instrumentation:
+    # Timers per phase of the calculations, named <calculation>.<phase>, and latency histograms per calculation call.
+    # A disabled instance hands out a timer that does nothing, so the calculations time their phases unconditionally.
+    # Every calculation runs in its own thread and only records phases under its own name.
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases: Dict[str, PhaseStatistics] = {}
+        self.latency_histograms: Dict[str, List[int]] = {}
+        self.peak_memory_kilobytes: Dict[str, int] = {}
+
+    def timer(self, calculation: str):
+        return PhaseTimer(self, calculation) if self.enabled else NO_OP_TIMER
+
+    def record_phase(self, phase: str, start: float) -> float:
+        # Returns the end time, which is the start of the next phase
+        end = time.perf_counter()
+        statistics = self.phases.get(phase)
+        if statistics is None:
+            statistics = self.phases[phase] = PhaseStatistics()
+        statistics.add(end - start)
+        return end
+
+    def record_call(self, calculation: str, start: float) -> float:
+        end = self.record_phase(calculation, start)
+        histogram = self.latency_histograms.get(calculation)
+        if histogram is None:
+            histogram = self.latency_histograms[calculation] = [0] * (len(LATENCY_BUCKET_BOUNDS_IN_SECONDS) + 1)
+        histogram[bisect.bisect_left(LATENCY_BUCKET_BOUNDS_IN_SECONDS, end - start)] += 1
+        return end
+
+    def record_peak_memory(self, label: str):
+        # Peak resident memory of the process so far, in kilobytes on Linux
+        self.peak_memory_kilobytes[label] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def report(self) -> dict:
+        return {"phases": {phase: statistics.report() for phase, statistics in sorted(self.phases.items())},
+                "latency_histograms": {"bucket_upper_bounds_in_seconds": LATENCY_BUCKET_BOUNDS_IN_SECONDS + [None],
+                                       **self.latency_histograms},
+                "peak_memory_kilobytes": self.peak_memory_kilobytes}
+
+    def write(self, path: str):
+        with open(path, "w") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+    def write_to_influx(self, influx_connector: InfluxDBConnector, simulation_time: datetime):
+        # The statistics are of the whole federate, so they are one point tagged with the model id and no esdl id
+        fields = {f"instrumentation.{phase}.{name}": value
+                  for phase, statistics in sorted(self.phases.items()) for name, value in statistics.report().items()}
+        fields.update({f"instrumentation.peak_memory_kilobytes.{label}": peak_memory_kilobytes
+                       for label, peak_memory_kilobytes in self.peak_memory_kilobytes.items()})
+        influx_connector.write([{"measurement": f"{influx_connector.esdl_type}",
+                                 "tags": {"simulation_id": influx_connector.simulation_id,
+                                          "model_id": influx_connector.model_id},
+                                 "time": simulation_time,
+                                 "fields": fields}])
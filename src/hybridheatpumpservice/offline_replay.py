@@ -0,0 +1,221 @@
+# Offline replay of recorded inputs through the calculations of the hybrid heat pump service, without a HELICS
+# broker or other federates. Every time step runs send_temperatures and update_temperatures for all houses, in the
+# same order as the HELICS executor, and the outputs are streamed to a CSV file.
+#
+#   python -m hybridheatpumpservice.offline_replay energy_system.esdl inputs.npz outputs.csv
+#   python -m hybridheatpumpservice.offline_replay energy_system.esdl weather.csv outputs.csv --heat-power heat_power.csv
+#
+# Input formats:
+#   weather:    one row per forecast time step (hhp_forecast_time_step_in_seconds) with the columns solar_irradiance,
+#               air_temperature and soil_temperature, the forecast of a time step is the window of forecast_horizon
+#               rows starting at that step
+#   heat power: one row per time step and esdl id with the columns time_step, esdl_id, heat_power_to_buffer_hhp and
+#               heat_power_to_house_hhp, grouped by time step
+#   npz:        the weather columns as 1-D arrays, heat_power_to_buffer_hhp and heat_power_to_house_hhp as
+#               time steps x houses arrays and the esdl_ids of the houses
+import argparse
+import csv
+import itertools
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import helics as h
+import numpy as np
+from dots_infrastructure import CalculationServiceHelperFunctions
+from dots_infrastructure.DataClasses import EsdlId, SimulatorConfiguration, TimeStepInformation
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.influxdb_connector import InfluxDBConnector
+from esdl import esdl
+from esdl.esdl_handler import EnergySystemHandler
+
+from hybridheatpumpservice.hybrid_heatpump_service import CalculationServiceHybridHeatPump
+
+WEATHER_INPUT_NAMES = ["solar_irradiance", "air_temperature", "soil_temperature"]
+DEFAULT_FORECAST_HORIZON = 48
+
+
+class ReplayInputs(NamedTuple):
+    esdl_ids: List[EsdlId]
+    # Weather series per input name, one value per time step
+    weather: Dict[str, np.array]
+    # Per time step the heat power to the buffers and to the houses, in the order of esdl_ids
+    heat_power_steps: Iterator[Tuple[np.array, np.array]]
+
+
+class FileOutputConnector(InfluxDBConnector):
+    # Writes the data points that would go to influx as CSV rows: time, esdl_id, output_name, value
+    def __init__(self, output_path: str):
+        super().__init__("file", "", "", "", "")
+        self.output_file = open(output_path, "w", newline="")
+        self.writer = csv.writer(self.output_file)
+        self.writer.writerow(["time", "esdl_id", "output_name", "value"])
+
+    def connect(self):
+        return None
+
+    def set_time_step_data_point(self, esdl_id: EsdlId, output_name: str, simulation_datetime: datetime, value: float):
+        self.writer.writerow([simulation_datetime.isoformat(), esdl_id, output_name, repr(value)])
+
+    def write_output(self):
+        self.output_file.flush()
+
+    def close(self):
+        self.output_file.close()
+
+
+def heat_power_steps_from_rows(rows: Iterable[dict]) -> Tuple[List[EsdlId], Iterator[Tuple[np.array, np.array]]]:
+    # Rows in long format grouped by time step, the esdl ids of the first time step fix the order of the houses
+    time_steps = itertools.groupby(rows, key=lambda row: int(row["time_step"]))
+    try:
+        first_time_step, first_rows = next(time_steps)
+    except StopIteration:
+        raise ValueError("heat power input contains no time steps")
+    first_rows = list(first_rows)
+    esdl_ids = [row["esdl_id"] for row in first_rows]
+    index = {esdl_id: i for i, esdl_id in enumerate(esdl_ids)}
+
+    def steps():
+        for time_step, step_rows in itertools.chain([(first_time_step, first_rows)], time_steps):
+            heat_powers = np.full((2, len(esdl_ids)), np.nan)
+            for row in step_rows:
+                i = index[row["esdl_id"]]
+                heat_powers[0, i] = float(row["heat_power_to_buffer_hhp"])
+                heat_powers[1, i] = float(row["heat_power_to_house_hhp"])
+            if np.isnan(heat_powers).any():
+                raise ValueError(f"heat power input misses esdl ids in time step {time_step}")
+            yield heat_powers[0], heat_powers[1]
+
+    return esdl_ids, steps()
+
+
+def read_csv_rows(path: str) -> Iterator[dict]:
+    with open(path, newline="") as csv_file:
+        yield from csv.DictReader(csv_file)
+
+
+def load_npz_inputs(path: str) -> ReplayInputs:
+    data = np.load(path)
+    heat_power_to_buffer = data["heat_power_to_buffer_hhp"]
+    heat_power_to_house = data["heat_power_to_house_hhp"]
+    return ReplayInputs([str(esdl_id) for esdl_id in data["esdl_ids"]],
+                        {name: data[name].astype(float) for name in WEATHER_INPUT_NAMES},
+                        zip(heat_power_to_buffer, heat_power_to_house))
+
+
+def load_csv_inputs(weather_path: str, heat_power_path: str) -> ReplayInputs:
+    weather = np.genfromtxt(weather_path, delimiter=",", names=True, ndmin=1)
+    esdl_ids, heat_power_steps = heat_power_steps_from_rows(read_csv_rows(heat_power_path))
+    return ReplayInputs(esdl_ids, {name: weather[name].astype(float) for name in WEATHER_INPUT_NAMES}, heat_power_steps)
+
+
+def load_parquet_inputs(weather_path: str, heat_power_path: str) -> ReplayInputs:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Replaying Parquet inputs requires pyarrow, install it with 'pip install pyarrow'") from e
+    weather = pq.read_table(weather_path, columns=WEATHER_INPUT_NAMES)
+    rows = (row for batch in pq.ParquetFile(heat_power_path).iter_batches() for row in batch.to_pylist())
+    esdl_ids, heat_power_steps = heat_power_steps_from_rows(rows)
+    return ReplayInputs(esdl_ids, {name: weather.column(name).to_numpy().astype(float) for name in WEATHER_INPUT_NAMES},
+                        heat_power_steps)
+
+
+def load_inputs(weather_path: str, heat_power_path: Optional[str] = None) -> ReplayInputs:
+    suffix = Path(weather_path).suffix.lower()
+    if suffix == ".npz":
+        return load_npz_inputs(weather_path)
+    if heat_power_path is None:
+        raise ValueError(f"Replaying {suffix} inputs requires a separate heat power input file")
+    if suffix == ".csv":
+        return load_csv_inputs(weather_path, heat_power_path)
+    if suffix == ".parquet":
+        return load_parquet_inputs(weather_path, heat_power_path)
+    raise ValueError(f"Unknown input format {suffix}, expected .npz, .csv or .parquet")
+
+
+def create_offline_service(esdl_ids: List[EsdlId], start_time: datetime, simulation_duration_in_seconds: int) -> CalculationServiceHybridHeatPump:
+    # The executor reads its configuration from the environment on construction, for a replay it is given directly
+    simulator_configuration = SimulatorConfiguration("HybridHeatPump", esdl_ids, "offline-replay", "127.0.0.1", 0,
+                                                     "offline-replay", simulation_duration_in_seconds, start_time,
+                                                     "", "", "", "", "", h.HelicsLogLevel.WARNING, [])
+    get_simulator_configuration = CalculationServiceHelperFunctions.get_simulator_configuration_from_environment
+    CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = lambda: simulator_configuration
+    try:
+        return CalculationServiceHybridHeatPump()
+    finally:
+        CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = get_simulator_configuration
+
+
+def replay(energy_system: esdl.EnergySystem, inputs: ReplayInputs, output_path: str, start_time: datetime,
+           forecast_horizon: int = DEFAULT_FORECAST_HORIZON) -> int:
+    # Returns the number of replayed time steps
+    service = create_offline_service(inputs.esdl_ids, start_time, 0)
+    period = service.hybridheatpump_period_in_seconds
+    # A period can span multiple weather rows when the federate exchanges less often than the forecast resolution
+    rows_per_time_step = max(round(period / service.settings.forecast_time_step_in_seconds), 1)
+    number_of_rows = min(len(series) for series in inputs.weather.values())
+    number_of_time_steps = number_of_rows // rows_per_time_step
+    service.simulator_configuration.simulation_duration_in_seconds = number_of_time_steps * period
+    service.influx_connector = FileOutputConnector(output_path)
+    service.init_calculation_service(energy_system)
+
+    # The forecast of the last time steps is padded with the last recorded value
+    padded_weather = {name: np.concatenate([series[:number_of_rows], np.repeat(series[number_of_rows - 1], forecast_horizon - 1)])
+                      for name, series in inputs.weather.items()}
+
+    replayed_time_steps = 0
+    try:
+        for k, (heat_to_buffer, heat_to_house) in enumerate(inputs.heat_power_steps):
+            if k >= number_of_time_steps:
+                raise ValueError(f"heat power input has more time steps than the {number_of_time_steps} weather time steps")
+            # A service restored from a checkpoint continues after the time step of the checkpoint
+            if k + 1 <= service.restored_time_step_number:
+                continue
+            # Same time step numbering and simulation time as the HELICS executor, the first calculation is at one period
+            # and a restored run counts its time steps from one again
+            restored_time_step_number = service.restored_time_step_number
+            time_step_information = TimeStepInformation(k + 1 - restored_time_step_number, number_of_time_steps - restored_time_step_number)
+            simulation_time = start_time + timedelta(seconds=(k + 1) * period)
+            first_row = k * rows_per_time_step
+            weather_params = {name: series[first_row:first_row + forecast_horizon].tolist() for name, series in padded_weather.items()}
+
+            for esdl_id in inputs.esdl_ids:
+                service.send_temperatures(weather_params, simulation_time, time_step_information, esdl_id, energy_system)
+            for esdl_id, heat_power_to_buffer, heat_power_to_house in zip(inputs.esdl_ids, heat_to_buffer.tolist(), heat_to_house.tolist()):
+                param_dict = dict(weather_params, heat_power_to_buffer_hhp=heat_power_to_buffer, heat_power_to_house_hhp=heat_power_to_house)
+                service.update_temperatures(param_dict, simulation_time, time_step_information, esdl_id, energy_system)
+            replayed_time_steps += 1
+    finally:
+        service.influx_output.flush(service.influx_connector)
+        service.bounds.log_summary()
+        if service.instrumentation.enabled:
+            service.write_instrumentation()
+        service.influx_connector.write_output()
+        service.influx_connector.close()
+        service.fleet.close()
+    return replayed_time_steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded inputs through the hybrid heat pump service without HELICS")
+    parser.add_argument("esdl_file")
+    parser.add_argument("inputs", help="weather input (.csv or .parquet) or all inputs (.npz)")
+    parser.add_argument("output", help="CSV file to write the outputs to")
+    parser.add_argument("--heat-power", help="heat power input (.csv or .parquet) when the inputs are not an .npz")
+    parser.add_argument("--start-time", type=datetime.fromisoformat, default=datetime(2024, 1, 1))
+    parser.add_argument("--forecast-horizon", type=int, default=DEFAULT_FORECAST_HORIZON)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    LOGGER.setLevel(logging.getLevelName(args.log_level.upper()))
+    esh = EnergySystemHandler()
+    energy_system = esh.load_file(args.esdl_file)
+    inputs = load_inputs(args.inputs, args.heat_power)
+    replayed_time_steps = replay(energy_system, inputs, args.output, args.start_time, args.forecast_horizon)
+    print(f"Replayed {replayed_time_steps} time steps of {len(inputs.esdl_ids)} hybrid heat pumps to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+from typing import List
+
+import helics as h
+import numpy as np
+from dots_infrastructure.DataClasses import CalculationServiceOutput, EsdlId, PublicationDescription
+from dots_infrastructure.HelicsFederateHelpers import HelicsValueFederateExecutor
+from dots_infrastructure.Logger import LOGGER
+
+# In the aggregated publication mode the buffer and house temperatures of all houses of the federate are published
+# as one binary message per step instead of two publications per house. The message is the fleet state as float64
+# in native byte order, per house [indoor, outdoor, buffer] temperature, in the order of the manifest: a JSON list
+# of the esdl ids which is only transmitted with the first message.
+AGGREGATED_TEMPERATURES_OUTPUT = "fleet_temperatures"
+AGGREGATED_MANIFEST_OUTPUT = "fleet_temperatures_manifest"
+AGGREGATED_PUBLICATIONS = [
+    PublicationDescription(global_flag=True,
+                           esdl_type="HybridHeatPump",
+                           output_name=AGGREGATED_TEMPERATURES_OUTPUT,
+                           output_unit="K",
+                           data_type=h.HelicsDataType.RAW),
+    PublicationDescription(global_flag=True,
+                           esdl_type="HybridHeatPump",
+                           output_name=AGGREGATED_MANIFEST_OUTPUT,
+                           output_unit="",
+                           data_type=h.HelicsDataType.STRING)
+]
+
+
+def pack_temperatures(state: np.array) -> bytes:
+    return np.ascontiguousarray(state, dtype=np.float64).tobytes()
+
+
+def pack_manifest(esdl_ids: List[EsdlId]) -> str:
+    return json.dumps(esdl_ids)
+
+
+def unpack_temperatures(message: bytes) -> np.array:
+    # Per house [indoor, outdoor, buffer] temperature (N x 3) in the order of the manifest
+    return np.frombuffer(message, dtype=np.float64).reshape(-1, 3)
+
+
+class AggregatedValueFederateExecutor(HelicsValueFederateExecutor):
+    # Registers the aggregated outputs of the calculation once under the key <esdl type>/<output name>/<model id>
+    # instead of once per esdl id. The calculation returns their values for the last esdl id of a step, after all
+    # houses are calculated, and they are published with the outputs of that esdl id.
+    def init_outputs(self, pubs: List[PublicationDescription], value_federate: h.HelicsValueFederate):
+        aggregated_names = [description.output_name for description in AGGREGATED_PUBLICATIONS]
+        super().init_outputs([pub for pub in pubs if pub.output_name not in aggregated_names], value_federate)
+        esdl_ids = self.simulator_configuration.esdl_ids
+        for esdl_id in esdl_ids:
+            self.output_dict.setdefault(esdl_id, [])
+        model_id = self.simulator_configuration.model_id
+        for description in pubs:
+            if description.output_name not in aggregated_names:
+                continue
+            key = f"{description.esdl_type}/{description.output_name}/{model_id}"
+            LOGGER.debug("Registering aggregated publication with key: %s", key)
+            publication = h.helicsFederateRegisterGlobalPublication(value_federate, key, description.data_type,
+                                                                    description.output_unit)
+            # The manifest only changes with the fleet, so it is sent once
+            if description.output_name == AGGREGATED_MANIFEST_OUTPUT:
+                h.helicsPublicationSetOption(publication, h.HELICS_HANDLE_OPTION_ONLY_TRANSMIT_ON_CHANGE, True)
+            self.output_dict[esdl_ids[-1]].append(CalculationServiceOutput(description.global_flag, description.esdl_type,
+                                                                           description.output_name, model_id,
+                                                                           description.data_type, description.output_unit,
+                                                                           publication))
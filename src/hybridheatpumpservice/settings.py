@@ -0,0 +1,78 @@
+import os
+from dataclasses import dataclass
+
+from hybridheatpumpservice.bounds import BOUNDS_POLICIES, RAISE
+from hybridheatpumpservice.thermalsystems import EULER, INTEGRATION_METHODS
+
+
+@dataclass
+class HybridHeatPumpSettings:
+    integration_method : str = EULER
+    free_float_forecast : bool = False
+    period_in_seconds : int = 900
+    internal_time_step_in_seconds : float = 900
+    forecast_time_step_in_seconds : float = 900
+    influx_flush_size : int = 0
+    influx_flush_interval_in_seconds : float = 0.0
+    influx_extended_outputs : bool = False
+    diagnostics_step_summary : bool = False
+    diagnostics_near_bound_margin : float = 0.5
+    number_of_worker_processes : int = 0
+    checkpoint_path : str = ""
+    checkpoint_interval_in_time_steps : int = 0
+    restore_checkpoint_path : str = ""
+    bounds_policy : str = RAISE
+    aggregated_publication : bool = False
+    instrumentation : bool = False
+    instrumentation_path : str = "hybridheatpump_instrumentation.json"
+    # Written as one point of the federate, tagged with the simulation and model id and without esdl id
+    instrumentation_influx : bool = False
+
+    @property
+    def number_of_sub_steps(self) -> int:
+        return round(self.period_in_seconds / self.internal_time_step_in_seconds)
+
+
+def get_bool_from_environment(name : str, default : bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def get_settings_from_environment() -> HybridHeatPumpSettings:
+    integration_method = os.getenv("hhp_integration_method", EULER).lower()
+    if integration_method not in INTEGRATION_METHODS:
+        raise ValueError(f"Unknown hhp_integration_method {integration_method}, expected one of {INTEGRATION_METHODS}")
+    free_float_forecast = get_bool_from_environment("hhp_free_float_forecast", False)
+    # Exchange interval with the other federates and the integration step within it, which has to divide the period
+    period_in_seconds = int(os.getenv("hhp_period_in_seconds", 900))
+    internal_time_step_in_seconds = float(os.getenv("hhp_internal_time_step_in_seconds", period_in_seconds))
+    if period_in_seconds <= 0 or internal_time_step_in_seconds <= 0:
+        raise ValueError("hhp_period_in_seconds and hhp_internal_time_step_in_seconds should be positive")
+    number_of_sub_steps = period_in_seconds / internal_time_step_in_seconds
+    if abs(number_of_sub_steps - round(number_of_sub_steps)) > 1.0e-9 or round(number_of_sub_steps) < 1:
+        raise ValueError(f"hhp_internal_time_step_in_seconds {internal_time_step_in_seconds} should divide hhp_period_in_seconds {period_in_seconds}")
+    forecast_time_step_in_seconds = float(os.getenv("hhp_forecast_time_step_in_seconds", 900))
+    influx_flush_size = int(os.getenv("hhp_influx_flush_size", 0))
+    influx_flush_interval_in_seconds = float(os.getenv("hhp_influx_flush_interval_in_seconds", 0.0))
+    influx_extended_outputs = get_bool_from_environment("hhp_influx_extended_outputs", False)
+    diagnostics_step_summary = get_bool_from_environment("hhp_diagnostics_step_summary", False)
+    diagnostics_near_bound_margin = float(os.getenv("hhp_diagnostics_near_bound_margin", 0.5))
+    number_of_worker_processes = int(os.getenv("hhp_number_of_worker_processes", 0))
+    checkpoint_path = os.getenv("hhp_checkpoint_path", "")
+    checkpoint_interval_in_time_steps = int(os.getenv("hhp_checkpoint_interval_in_time_steps", 0))
+    if checkpoint_interval_in_time_steps > 0 and not checkpoint_path:
+        raise ValueError("hhp_checkpoint_interval_in_time_steps is set without hhp_checkpoint_path")
+    restore_checkpoint_path = os.getenv("hhp_restore_checkpoint_path", "")
+    bounds_policy = os.getenv("hhp_bounds_policy", RAISE).lower()
+    if bounds_policy not in BOUNDS_POLICIES:
+        raise ValueError(f"Unknown hhp_bounds_policy {bounds_policy}, expected one of {BOUNDS_POLICIES}")
+    aggregated_publication = get_bool_from_environment("hhp_aggregated_publication", False)
+    instrumentation = get_bool_from_environment("hhp_instrumentation", False)
+    instrumentation_path = os.getenv("hhp_instrumentation_path", "hybridheatpump_instrumentation.json")
+    instrumentation_influx = get_bool_from_environment("hhp_instrumentation_influx", False)
+    return HybridHeatPumpSettings(integration_method, free_float_forecast, period_in_seconds, internal_time_step_in_seconds,
+                                  forecast_time_step_in_seconds, influx_flush_size,
+                                  influx_flush_interval_in_seconds, influx_extended_outputs,
+                                  diagnostics_step_summary, diagnostics_near_bound_margin,
+                                  number_of_worker_processes, checkpoint_path, checkpoint_interval_in_time_steps,
+                                  restore_checkpoint_path, bounds_policy, aggregated_publication,
+                                  instrumentation, instrumentation_path, instrumentation_influx)
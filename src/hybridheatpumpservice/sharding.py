@@ -0,0 +1,109 @@
+import multiprocessing
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from typing import List
+
+from dots_infrastructure.DataClasses import EsdlId
+from dots_infrastructure.Logger import LOGGER
+from hybridheatpumpservice.fleet import FLEET_FLOATS_PER_HOUSE, HouseFleet, fleet_arrays, update_buffer_temperatures, update_house_temperatures
+from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+
+
+def run_fleet_worker(shared_memory_name: str, number_of_houses: int, start: int, end: int, connection: Connection):
+    # Advances houses start:end of the fleet buffer in shared memory for every time step received, None stops the worker
+    fleet_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    buffer = np.ndarray(FLEET_FLOATS_PER_HOUSE * number_of_houses, buffer=fleet_memory.buf)
+    (state, ambient_temperatures, solar_irradiance, heat_to_house, heat_to_buffer,
+     buffer_capacitance, coefficients) = fleet_arrays(buffer, number_of_houses)
+    shard = slice(start, end)
+    house_temperatures = state[shard, 0:2]
+    buffer_temperatures = state[shard, 2]
+    ambient_temperatures = ambient_temperatures[shard]
+    solar_irradiance = solar_irradiance[shard]
+    heat_to_house = heat_to_house[shard]
+    heat_to_buffer = heat_to_buffer[shard]
+    buffer_capacitance = buffer_capacitance[shard]
+    coefficients = coefficients[:, shard]
+    del state, buffer
+    try:
+        while True:
+            time_step = connection.recv()
+            if time_step is None:
+                break
+            try:
+                update_house_temperatures(coefficients, house_temperatures, ambient_temperatures, solar_irradiance, heat_to_house)
+                update_buffer_temperatures(time_step, buffer_temperatures, buffer_capacitance, heat_to_house, heat_to_buffer)
+                connection.send(None)
+            except Exception as e:
+                connection.send(e)
+    finally:
+        # The views on the shared memory have to be released before it can be closed
+        del house_temperatures, buffer_temperatures, ambient_temperatures, solar_irradiance, heat_to_house, heat_to_buffer
+        del buffer_capacitance, coefficients
+        fleet_memory.close()
+
+
+class ShardedHouseFleet(HouseFleet):
+    # HouseFleet with its buffer in shared memory, each time step the worker processes advance a contiguous block of
+    # houses in place. Only the (sub-)time step is sent to the workers, the inputs are copied into shared memory.
+    # The workers apply the same elementwise operations as HouseFleet.step, so the results are identical.
+    def __init__(self, esdl_ids: List[EsdlId], houses: List[House], heat_buffers: List[HeatBuffer], number_of_workers: int,
+                 number_of_sub_steps: int = 1):
+        n = len(esdl_ids)
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=max(FLEET_FLOATS_PER_HOUSE * n * 8, 1))
+        # Unlinks the segment when the fleet is closed, garbage collected or the interpreter exits without a close
+        self.unlink_shared_memory = weakref.finalize(self, self.shared_memory.unlink)
+        self.connections: List[Connection] = []
+        self.workers = []
+        super().__init__(esdl_ids, houses, heat_buffers, number_of_sub_steps,
+                         np.ndarray(FLEET_FLOATS_PER_HOUSE * n, buffer=self.shared_memory.buf))
+
+        # Spawned instead of forked as the executor runs its calculations in threads
+        context = multiprocessing.get_context("spawn")
+        bounds = np.linspace(0, n, min(number_of_workers, max(n, 1)) + 1).astype(int)
+        try:
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                connection, worker_connection = context.Pipe()
+                worker = context.Process(target=run_fleet_worker, daemon=True,
+                                         args=(self.shared_memory.name, n, int(start), int(end), worker_connection))
+                self.connections.append(connection)
+                worker.start()
+                worker_connection.close()
+                self.workers.append(worker)
+        except Exception:
+            self.close()
+            raise
+        LOGGER.info("Started %d fleet worker processes for %d houses", len(self.workers), n)
+
+    def advance(self, time_step: float):
+        self.load_coefficients(time_step)
+        for connection in self.connections:
+            connection.send(time_step)
+        errors = [error for error in (connection.recv() for connection in self.connections) if error is not None]
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        if not self.unlink_shared_memory.alive:
+            return
+        for connection, worker in zip(self.connections, self.workers):
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            worker.join()
+        for connection in self.connections:
+            connection.close()
+        self.connections.clear()
+        self.workers.clear()
+        # The houses and heat buffers keep views on the buffer, move them to process memory so that their
+        # temperatures stay readable and the shared memory can be unmapped
+        self.move_to_buffer(np.empty(len(self.buffer)))
+        self.unlink_shared_memory()
+        try:
+            self.shared_memory.close()
+        except BufferError:
+            # Views on the buffer taken outside the fleet keep the mapping until they are released
+            LOGGER.warning("Fleet shared memory %s is still in use and stays mapped", self.shared_memory.name)
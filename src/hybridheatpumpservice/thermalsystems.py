@@ -1,12 +1,30 @@
+import math
 import numpy as np
 from numpy.linalg import inv
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Optional
 from dots_infrastructure.Logger import LOGGER
 
+# Integration methods for the house model
+EULER = "euler"  # explicit Euler step over the whole time step
+EXACT = "exact"  # exact discretization with a zero-order hold on the inputs
+INTEGRATION_METHODS = (EULER, EXACT)
+
+# Forecast matrices are kept for this many (time step, horizon) pairs per model, usually only one is used
+FORECAST_MATRICES_CACHE_SIZE = 8
+
+
+class HouseModel:
+    # Immutable building model, the matrices only depend on the building parameters and are shared
+    # by all houses with the same parameters, see HouseModels
+    __slots__ = ('integration_method', 'C', 'C_inv', 'k_total', 'K', 'K_amb', 'A', 'A_inv', 'window_area', 'shgc',
+                 'discrete_time_matrices_cache', 'update_coefficients_cache', 'forecast_matrices_cache')
+
+    def __init__(self, capacities: dict, resistances: dict, window_area: float, integration_method: str = EULER):
+        if integration_method not in INTEGRATION_METHODS:
+            raise ValueError(f"Unknown integration method {integration_method}, expected one of {INTEGRATION_METHODS}")
+        self.integration_method = integration_method
 
-class House:
-    # solar is left out for now, because we obtain these from the heat profile generator
-    def __init__(self, capacities: dict, resistances: dict, window_area: float):
         # Create capacity matrix and its inverse
         self.C = np.diag(np.array([capacities['C_in'], capacities['C_out']]))
         self.C_inv = inv(self.C)
@@ -24,77 +42,244 @@ class House:
         self.K = np.array([[k_vent + k_exch + k_floor, -k_exch], [-k_exch, k_cond + k_exch]])
         self.K_amb = np.array([[k_vent, k_floor], [k_cond, 0]])
 
-        # Note that both K and K_amb are diagonally dominant and thus invertible
-        self.K_inv = inv(self.K)
-        self.K_amb_inv = inv(self.K_amb)
-
-        # precomputed matrices
+        # precomputed matrices, K is diagonally dominant and thus A is invertible
         self.A = np.matmul(self.C_inv, self.K)
-        self.A_amb = np.matmul(self.C_inv, self.K_amb)
         self.A_inv = inv(self.A)
 
-        self.exponential_matrix = None
+        for matrix in [self.C, self.C_inv, self.K, self.K_amb, self.A, self.A_inv]:
+            matrix.setflags(write=False)
+
+        # discrete time matrices (exp(-A dt), input matrix) per time step, filled on first use
+        self.discrete_time_matrices_cache: dict[float, tuple[np.array, np.array]] = {}
+        # scalar coefficients of the closed form update per time step, see update_coefficients
+        self.update_coefficients_cache: dict[float, tuple] = {}
+        # state and input response matrices over a forecast horizon per (time step, horizon)
+        self.forecast_matrices_cache: dict[tuple[float, int], tuple[np.array, np.array]] = {}
 
         self.window_area = window_area
         self.shgc = 0.7  # solar heat gain coefficient
 
+    def discrete_time_matrices(self, time_step: float):
+        # Matrices of T[k+1] = A_d T[k] + B_d (K_amb T_amb + solar_vector + heat_to_house_vector)
+        if time_step not in self.discrete_time_matrices_cache:
+            if self.integration_method == EXACT:
+                A_d = self.exponential_matrix(time_step)
+                B_d = np.matmul(self.A_inv, np.matmul(np.eye(2) - A_d, self.C_inv))
+            else:
+                A_d = np.eye(2) - time_step * self.A
+                B_d = time_step * self.C_inv
+            A_d.setflags(write=False)
+            B_d.setflags(write=False)
+            self.discrete_time_matrices_cache[time_step] = (A_d, B_d)
+        return self.discrete_time_matrices_cache[time_step]
+
+    def update_coefficients(self, time_step: float):
+        # T[k+1] = A_d T[k] + B_d (K_amb T_amb + solar_vector + heat_to_house_vector) written out per element:
+        # T_in[k+1]  = a_ii T_in + a_io T_out + b_air_i air + b_soil_i soil + b_solar_i solar + b_heat_i heat
+        # T_out[k+1] = a_oi T_in + a_oo T_out + b_air_o air + b_soil_o soil + b_solar_o solar + b_heat_o heat
+        coefficients = self.update_coefficients_cache.get(time_step)
+        if coefficients is None:
+            A_d, B_d = self.discrete_time_matrices(time_step)
+            B_amb = np.matmul(B_d, self.K_amb)
+            coefficients = (float(A_d[0, 0]), float(A_d[0, 1]), float(A_d[1, 0]), float(A_d[1, 1]),
+                            float(B_amb[0, 0]), float(B_amb[0, 1]), float(B_d[0, 0] * self.window_area), float(B_d[0, 0]),
+                            float(B_amb[1, 0]), float(B_amb[1, 1]), float(B_d[1, 0] * self.window_area), float(B_d[1, 0]))
+            self.update_coefficients_cache[time_step] = coefficients
+        return coefficients
+
+    def forecast_matrices(self, time_step: float, horizon: int):
+        # Over the horizon T[k+1] = A_d^(k+1) T[0] + sum_j<=k A_d^(k-j) B_d u[j], returns the state response
+        # A_d^(k+1) (horizon x 2 x 2) and the block lower triangular input response (horizon x 2 x 2 x horizon)
+        key = (time_step, horizon)
+        if key not in self.forecast_matrices_cache:
+            if len(self.forecast_matrices_cache) >= FORECAST_MATRICES_CACHE_SIZE:
+                del self.forecast_matrices_cache[next(iter(self.forecast_matrices_cache))]
+            A_d, B_d = self.discrete_time_matrices(time_step)
+            state_response = np.empty((horizon, 2, 2))
+            markov_parameters = np.empty((horizon, 2, 2))
+            power = np.eye(2)
+            for k in range(horizon):
+                markov_parameters[k] = np.matmul(power, B_d)
+                power = np.matmul(A_d, power)
+                state_response[k] = power
+            # Toeplitz structure built from the horizon Markov parameters and stored contiguous, so that the
+            # prediction is a single matrix-vector product:
+            # input_response[k, :, :, j] = A_d^(k-j) B_d for j <= k and zero otherwise
+            padded = np.concatenate([markov_parameters[::-1], np.zeros((horizon - 1, 2, 2))])
+            input_response = np.ascontiguousarray(sliding_window_view(padded, horizon, axis=0)[::-1])
+            state_response.setflags(write=False)
+            input_response.setflags(write=False)
+            self.forecast_matrices_cache[key] = (state_response, input_response)
+        return self.forecast_matrices_cache[key]
+
+    def exponential_matrix(self, time_step: float):
+        # exp(-A dt) with A = C^-1 K. As C is diagonal and K symmetric, A is similar to the symmetric
+        # matrix S = C^-1/2 K C^-1/2, so exp(-A dt) = C^-1/2 exp(-S dt) C^1/2 follows from eigh(S).
+        c_sqrt = np.sqrt(np.diag(self.C))
+        S = self.K / np.outer(c_sqrt, c_sqrt)
+        eigenvalues, eigenvectors = np.linalg.eigh(S)
+        exp_S = np.matmul(eigenvectors * np.exp(-eigenvalues * time_step), eigenvectors.T)
+        return exp_S * np.outer(1.0 / c_sqrt, c_sqrt)
+
+
+class HouseModels:
+    # Building models by parameters, large ESDLs reuse a limited number of archetypes. The models are shared by the
+    # houses created with the same HouseModels, e.g. those of one service, and released together with it.
+    def __init__(self):
+        self.models: dict[tuple, HouseModel] = {}
+
+    def __len__(self):
+        return len(self.models)
+
+    def get(self, capacities: dict, resistances: dict, window_area: float, integration_method: str = EULER) -> HouseModel:
+        key = (float(capacities['C_in']), float(capacities['C_out']),
+               float(resistances['R_exch']), float(resistances['R_floor']),
+               float(resistances['R_vent']), float(resistances['R_cond']),
+               float(window_area), integration_method)
+        house_model = self.models.get(key)
+        if house_model is None:
+            house_model = HouseModel(capacities, resistances, window_area, integration_method)
+            self.models[key] = house_model
+        return house_model
+
+
+def model_attribute(name: str):
+    return property(lambda house: getattr(house.model, name))
+
+
+class House:
+    # solar is left out for now, because we obtain these from the heat profile generator
+    __slots__ = ('model', 'temperatures')
+
+    def __init__(self, capacities: dict, resistances: dict, window_area: float, integration_method: str = EULER,
+                 house_models: Optional[HouseModels] = None):
+        if house_models is None:
+            self.model = HouseModel(capacities, resistances, window_area, integration_method)
+        else:
+            self.model = house_models.get(capacities, resistances, window_area, integration_method)
         self.temperatures: Optional[np.array] = None  # fill later if weather conditions are known
 
+    C = model_attribute('C')
+    C_inv = model_attribute('C_inv')
+    K = model_attribute('K')
+    K_amb = model_attribute('K_amb')
+    A = model_attribute('A')
+    A_inv = model_attribute('A_inv')
+    k_total = model_attribute('k_total')
+    window_area = model_attribute('window_area')
+    shgc = model_attribute('shgc')
+    integration_method = model_attribute('integration_method')
+
     def __str__(self):
         return f'House instance with: \n capacitances:\n {self.C} \n conductances:\n {self.K}\n  and\n {self.K_amb}'
 
-    def set_initial_temperatures(self, initial_temp_in: float, nominal_heat: float,
+    def discrete_time_matrices(self, time_step: float):
+        return self.model.discrete_time_matrices(time_step)
+
+    def predict_free_float_temperatures(self, time_step: float, air_temperatures, soil_temperatures, solar_irradiances):
+        # Indoor and outdoor temperatures at the end of each forecast step without heat to the house (horizon x 2)
+        air_temperatures = np.asarray(air_temperatures, dtype=float)
+        soil_temperatures = np.asarray(soil_temperatures, dtype=float)
+        solar_irradiances = np.asarray(solar_irradiances, dtype=float)
+        horizon = len(air_temperatures)
+        state_response, input_response = self.model.forecast_matrices(time_step, horizon)
+
+        inputs = np.empty((horizon, 2))
+        inputs[:, 0] = self.K_amb[0, 0] * air_temperatures + self.K_amb[0, 1] * soil_temperatures + \
+            self.window_area * solar_irradiances
+        inputs[:, 1] = self.K_amb[1, 0] * air_temperatures + self.K_amb[1, 1] * soil_temperatures
+        # Sum over the inputs b and forecast steps j of input_response[k, a, b, j] inputs[j, b]
+        input_contribution = np.matmul(input_response.reshape(2 * horizon, 2 * horizon), inputs.T.ravel())
+        return np.matmul(state_response, self.temperatures) + input_contribution.reshape(horizon, 2)
+
+    def unit_heat_response(self, time_step: float, horizon: int):
+        # Change of the indoor and outdoor temperatures at the end of each forecast step when 1 W is added to the
+        # house during the first step (horizon x 2), with linearity this gives the response to any heat schedule
+        _, input_response = self.model.forecast_matrices(time_step, horizon)
+        return input_response[:, :, 0, 0]
+
+    def equilibrium_temperatures(self, initial_temp_in: float, nominal_heat: float,
                                  air_temperature: float, soil_temperature: float, solar_irradiance: float):
+        # Returns the equilibrium (indoor, outdoor) temperatures and the heat to house required for the set point.
         # Idea calculate the initial_temp_out by assuming thermal equilibrium between the outside and inside,
         # we solve for T[1] and heat_to_house
         # We thus solve
         # 0 = -K T + K_amb T_amb + solar_vector + heat_to_house_vector, for T[1]
-        # We use: K T = T[0]K[:, 0]  + T[1]K[:, 1]
-        # so: [[-1, K21], [0, K22]] [heat_to_house, T[1]] = K_amb T_amb + solar_vector - T[0]K[:, 0]
-        ambient_temperatures = np.array([air_temperature, soil_temperature])
-        solar_vector = np.array([self.window_area * solar_irradiance, 0.0])
-
-        # write like Ax = b
-        A = self.K.copy()
-        A[:, 0] = np.array([-1.0, 0.0])
-        b = np.matmul(self.K_amb, ambient_temperatures) + solar_vector - initial_temp_in * self.K[:, 0].T
-        x = np.linalg.solve(A, b)
-        required_heat_to_house = x[0]
-        LOGGER.info(f"Required heat to house: {required_heat_to_house}")
-        LOGGER.info(f"Nominal heat: {nominal_heat}")
-        heat_to_house = np.clip(required_heat_to_house, 0, nominal_heat)
-        temperatures = np.linalg.solve(self.K, np.matmul(self.K_amb, ambient_temperatures) +
-                                       solar_vector + np.array([heat_to_house, 0]))
-        print(f"Temperatures: {temperatures}")
-        LOGGER.info(f"Target house temperature: {initial_temp_in}")
-        LOGGER.info(f"Initial house temperatures: {temperatures}")
+        # The second row gives T[1] = (K_amb[1, :] T_amb - K[1, 0] T[0]) / K[1, 1], the first row the heat to house.
+        # Both 2x2 systems are solved in closed form.
+        (k_00, k_01), (k_10, k_11) = self.K.tolist()
+        (k_amb_00, k_amb_01), (k_amb_10, k_amb_11) = self.K_amb.tolist()
+        forcing_in = k_amb_00 * air_temperature + k_amb_01 * soil_temperature + self.window_area * solar_irradiance
+        forcing_out = k_amb_10 * air_temperature + k_amb_11 * soil_temperature
+
+        temp_out_at_set_point = (forcing_out - k_10 * initial_temp_in) / k_11
+        required_heat_to_house = k_00 * initial_temp_in + k_01 * temp_out_at_set_point - forcing_in
+        heat_to_house = min(max(required_heat_to_house, 0.0), nominal_heat)
+
+        # Solve K T = K_amb T_amb + solar_vector + heat_to_house_vector with Cramer's rule
+        forcing_in += heat_to_house
+        determinant = k_00 * k_11 - k_01 * k_10
+        temp_in = (forcing_in * k_11 - k_01 * forcing_out) / determinant
+        temp_out = (k_00 * forcing_out - k_10 * forcing_in) / determinant
+        return temp_in, temp_out, required_heat_to_house
+
+    def set_initial_temperatures(self, initial_temp_in: float, nominal_heat: float,
+                                 air_temperature: float, soil_temperature: float, solar_irradiance: float):
+        temp_in, temp_out, required_heat_to_house = self.equilibrium_temperatures(initial_temp_in, nominal_heat, air_temperature,
+                                                                                  soil_temperature, solar_irradiance)
+        LOGGER.debug("Required heat to house: %s, nominal heat: %s, target house temperature: %s, initial house temperatures: %s",
+                     required_heat_to_house, nominal_heat, initial_temp_in, [temp_in, temp_out])
         # If heating was required, it should have been be satisfied by the heat pump and we should be at the set point.
         # If not, the temperature in the house will be higher then the set point
         if required_heat_to_house >= 0:
-            assert abs(initial_temp_in - temperatures[0]) < 1.0e-3, 'internal temperature should be as provided'
-        self.temperatures = temperatures
+            assert abs(initial_temp_in - temp_in) < 1.0e-3, 'internal temperature should be as provided'
+        if self.temperatures is None:
+            self.temperatures = np.empty(2)
+        self.temperatures[0] = temp_in
+        self.temperatures[1] = temp_out
 
     def get_temperatures(self):
         return self.temperatures
 
     def update_temperatures(self, time_step: float, air_temperature: float, soil_temperature: float,
                             solar_irradiance: float, heat_to_house: float):
-        # Define help vectors
-        ambient_temperatures = np.array([air_temperature, soil_temperature])
-        solar_vector = np.array([self.window_area * solar_irradiance, 0.0])
-        heat_to_house_vector = np.array([heat_to_house, 0.0])
-
         # Differential equation is:
         # C dT/dt = -K T + K_amb T_amb + solar_vector + heat_to_house_vector
-        self.temperatures += time_step * np.matmul(self.C_inv, - np.matmul(self.K, self.temperatures) +
-                                                   np.matmul(self.K_amb, ambient_temperatures) +
-                                                   solar_vector + heat_to_house_vector)
+        # discretized with the integration method of the model and evaluated in closed form, see update_coefficients
+        (a_ii, a_io, a_oi, a_oo,
+         b_air_i, b_soil_i, b_solar_i, b_heat_i,
+         b_air_o, b_soil_o, b_solar_o, b_heat_o) = self.model.update_coefficients(time_step)
+        temperatures = self.temperatures
+        temp_in = temperatures.item(0)
+        temp_out = temperatures.item(1)
+        temperatures[0] = (a_ii * temp_in + a_io * temp_out) + (b_air_i * air_temperature + b_soil_i * soil_temperature +
+                                                              b_solar_i * solar_irradiance + b_heat_i * heat_to_house)
+        temperatures[1] = (a_oi * temp_in + a_oo * temp_out) + (b_air_o * air_temperature + b_soil_o * soil_temperature +
+                                                              b_solar_o * solar_irradiance + b_heat_o * heat_to_house)
 
 
 class HeatBuffer:
+    __slots__ = ('capacitance', 'state', 'index')
+
     def __init__(self, buffer_capacitance):
         self.capacitance = buffer_capacitance
-        self.temperature: Optional[float] = None
+        # The temperature lives in state[index], NaN while not set. A HouseFleet binds the buffer to its state array.
+        self.state = np.full(1, np.nan)
+        self.index = 0
+
+    @property
+    def temperature(self) -> Optional[float]:
+        temperature = self.state.item(self.index)
+        return None if math.isnan(temperature) else temperature
+
+    @temperature.setter
+    def temperature(self, temperature: Optional[float]):
+        self.state[self.index] = np.nan if temperature is None else temperature
+
+    def bind(self, state: np.array, index: int):
+        state[index] = self.state[self.index]
+        self.state = state
+        self.index = index
 
     def set_initial_temperature(self, initial_buffer_temp: float):
         self.temperature = initial_buffer_temp
@@ -104,7 +289,7 @@ class HeatBuffer:
 
     def update_temperature(self, time_step: float, heat_out: float, heat_in: float):
         energy_to_buffer = (heat_in - heat_out) * time_step
-        self.temperature += energy_to_buffer/self.capacitance
+        self.state[self.index] += energy_to_buffer/self.capacitance
 
 
 class objectfunctions:
@@ -0,0 +1,79 @@
+import unittest
+
+from dots_infrastructure.Logger import LOGGER
+from hybridheatpumpservice.bounds import BOUNDS_EPS, CLAMP, RAISE, RECORD, BoundsChecker
+from hybridheatpumpservice.descriptions import HybridHeatPumpDescription
+from hybridheatpumpservice.fleet import HouseFleet
+from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+
+CAPACITIES = {'C_in': 26146400.0, 'C_out': 78439200.0}
+RESISTANCES = {'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+               'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074}
+DESCRIPTION = HybridHeatPumpDescription(752940.0, 298.15, 338.15, 315.0, 290.85, 291.65)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.esdl_ids = ["hhp-1", "hhp-2", "hhp-3", "hhp-4"]
+        houses = [House(CAPACITIES, RESISTANCES, 31.39) for _ in self.esdl_ids]
+        heat_buffers = [HeatBuffer(DESCRIPTION.buffer_capacitance) for _ in self.esdl_ids]
+        self.fleet = HouseFleet(self.esdl_ids, houses, heat_buffers)
+        for esdl_id, house, heat_buffer in zip(self.esdl_ids, houses, heat_buffers):
+            house.set_initial_temperatures(DESCRIPTION.house_temp_0, 9000.0, 283.0, 290.05, 0.0)
+            heat_buffer.set_initial_temperature(DESCRIPTION.buffer_temp_0)
+            self.fleet.bind(esdl_id)
+        # hhp-1 within eps of its lower buffer bound, hhp-2 over its buffer bound, hhp-3 and hhp-4 under their house bound
+        self.fleet.buffer_temperatures[0:2] = [298.15 - 0.5 * BOUNDS_EPS, 340.0]
+        self.fleet.house_temperatures[2:4, 0] = [290.0, 289.0]
+
+    def test_raise_lists_every_violation(self):
+        bounds = BoundsChecker(self.esdl_ids, [DESCRIPTION] * 4, RAISE)
+
+        with self.assertRaises(ValueError) as context:
+            bounds.correct_and_check("2024-01-01 00:15:00", self.fleet)
+
+        self.assertIn("['hhp-2'] charged over/under their buffer capacity", str(context.exception))
+        self.assertIn("['hhp-3', 'hhp-4'] charged under their house capacity", str(context.exception))
+
+    def test_clamp_and_record_continue(self):
+        for policy, expected_buffer_temperature, expected_indoor_temperature in [(CLAMP, 338.15 - BOUNDS_EPS, 290.85 + BOUNDS_EPS),
+                                                                                 (RECORD, 340.0, 290.0)]:
+            self.setUp()
+            bounds = BoundsChecker(self.esdl_ids, [DESCRIPTION] * 4, policy)
+
+            with self.assertLogs(LOGGER, level="WARNING") as logs:
+                violations = bounds.correct_and_check("2024-01-01 00:15:00", self.fleet)
+
+            self.assertEqual(len(logs.output), 1)
+            self.assertEqual(violations.buffer_esdl_ids, ["hhp-2"])
+            self.assertEqual(violations.house_esdl_ids, ["hhp-3", "hhp-4"])
+            self.assertEqual(bounds.number_of_violation_steps, 1)
+            self.assertEqual(bounds.buffer_violation_counts.tolist(), [0, 1, 0, 0])
+            self.assertEqual(bounds.house_violation_counts.tolist(), [0, 0, 1, 1])
+            self.assertAlmostEqual(self.fleet.buffer_temperatures[0], 298.15 + BOUNDS_EPS)
+            self.assertAlmostEqual(self.fleet.buffer_temperatures[1], expected_buffer_temperature)
+            self.assertAlmostEqual(self.fleet.house_temperatures[2, 0], expected_indoor_temperature)
+            if policy == CLAMP:
+                self.assertIsNone(bounds.correct_and_check("2024-01-01 00:30:00", self.fleet))
+
+    def test_summary_lists_the_houses_with_most_violations(self):
+        # Arrange
+        bounds = BoundsChecker(self.esdl_ids, [DESCRIPTION] * 4, RECORD)
+        with self.assertLogs(LOGGER, level="WARNING"):
+            bounds.correct_and_check("2024-01-01 00:15:00", self.fleet)
+            self.fleet.house_temperatures[3, 0] = 291.65
+            bounds.correct_and_check("2024-01-01 00:30:00", self.fleet)
+
+        # Execute
+        with self.assertLogs(LOGGER, level="WARNING") as logs:
+            bounds.log_summary(number_of_houses=1)
+
+        # Assert
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("2 steps with hybrid heat pumps out of bounds (record)", logs.output[0])
+        self.assertIn("most buffer violations [('hhp-2', 2)], most house violations [('hhp-3', 2)]", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
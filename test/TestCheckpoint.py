@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from hybridheatpumpservice.checkpoint import read_checkpoint, write_checkpoint
+
+
+class Test(unittest.TestCase):
+
+    def test_write_and_read_checkpoint(self):
+        # Arrange
+        state = np.array([[291.65, 288.9, 315.0], [291.7, 289.1, 320.5]])
+        esdl_ids = ["hhp-1", "hhp-2"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoints", "hhp")
+
+            # Execute
+            write_checkpoint(path, state + 1.0, esdl_ids, 4, datetime(2024, 1, 1, 1))
+            write_checkpoint(path, state, esdl_ids, 8, datetime(2024, 1, 1, 2))
+            checkpoint = read_checkpoint(path)
+
+            # Assert
+            self.assertIsInstance(checkpoint.state, np.memmap)
+            np.testing.assert_array_equal(checkpoint.state, state)
+            self.assertEqual(checkpoint.esdl_ids, esdl_ids)
+            self.assertEqual(checkpoint.time_step_number, 8)
+            self.assertEqual(checkpoint.simulation_time, datetime(2024, 1, 1, 2))
+            self.assertEqual(sorted(os.listdir(os.path.dirname(path))), ["hhp.000008.npy", "hhp.json"])
+            del checkpoint
+
+
+if __name__ == '__main__':
+    unittest.main()
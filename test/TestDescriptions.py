@@ -0,0 +1,47 @@
+import json
+import unittest
+
+from hybridheatpumpservice.descriptions import BuildingDescription, parse_building_description, parse_hybrid_heat_pump_description
+
+
+BUILDING_DESCRIPTION = {'C_in': 26146400.0, 'C_out': 78439200.0, 'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+                        'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074, 'A_glass': 31.39}
+
+
+class Test(unittest.TestCase):
+
+    def test_parse_building_description(self):
+        description = parse_building_description(json.dumps(BUILDING_DESCRIPTION), "hhp-1")
+
+        self.assertEqual(description, BuildingDescription(**BUILDING_DESCRIPTION))
+        self.assertEqual(description.capacities(), {'C_in': 26146400.0, 'C_out': 78439200.0})
+
+    def test_parsed_descriptions_memo_parses_each_description_once(self):
+        parsed_descriptions = {}
+
+        first_description = parse_building_description(json.dumps(BUILDING_DESCRIPTION), "hhp-1", parsed_descriptions)
+        second_description = parse_building_description(json.dumps(BUILDING_DESCRIPTION), "hhp-2", parsed_descriptions)
+
+        self.assertIs(first_description, second_description)
+        self.assertEqual(len(parsed_descriptions), 1)
+
+    def test_invalid_descriptions_raise_with_esdl_id(self):
+        invalid_descriptions = [
+            "",
+            "{not json",
+            json.dumps({name: value for name, value in BUILDING_DESCRIPTION.items() if name != 'R_vent'}),
+            json.dumps({**BUILDING_DESCRIPTION, 'C_in': "large"}),
+            json.dumps({**BUILDING_DESCRIPTION, 'R_cond': 0.0}),
+        ]
+        for invalid_description in invalid_descriptions:
+            with self.subTest(description=invalid_description):
+                with self.assertRaisesRegex(ValueError, "hhp-1"):
+                    parse_building_description(invalid_description, "hhp-1")
+
+    def test_hybrid_heat_pump_description_misses_fields(self):
+        with self.assertRaisesRegex(ValueError, "buffer_temp_0"):
+            parse_hybrid_heat_pump_description(json.dumps({'buffer_capacitance': 752940.0}), "hhp-1")
+
+
+if __name__ == '__main__':
+    unittest.main()
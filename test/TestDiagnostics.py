@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+
+from dots_infrastructure.Logger import LOGGER
+from hybridheatpumpservice.descriptions import HybridHeatPumpDescription
+from hybridheatpumpservice.diagnostics import FleetDiagnostics
+from hybridheatpumpservice.fleet import HouseFleet
+from hybridheatpumpservice.thermalsystems import House, HeatBuffer
+
+CAPACITIES = {'C_in': 26146400.0, 'C_out': 78439200.0}
+RESISTANCES = {'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+               'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074}
+DESCRIPTION = HybridHeatPumpDescription(752940.0, 298.15, 338.15, 315.0, 290.85, 291.65)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        esdl_ids = ["hhp-1", "hhp-2", "hhp-3"]
+        houses = [House(CAPACITIES, RESISTANCES, 31.39) for _ in esdl_ids]
+        heat_buffers = [HeatBuffer(DESCRIPTION.buffer_capacitance) for _ in esdl_ids]
+        self.fleet = HouseFleet(esdl_ids, houses, heat_buffers)
+        for esdl_id, house, heat_buffer, buffer_temperature in zip(esdl_ids, houses, heat_buffers, [315.0, 298.3, 338.0]):
+            house.set_initial_temperatures(DESCRIPTION.house_temp_0, 9000.0, 283.0, 290.05, 0.0)
+            heat_buffer.set_initial_temperature(buffer_temperature)
+            self.fleet.bind(esdl_id)
+        self.fleet.house_temperatures[2, 0] = 291.0
+        self.diagnostics = FleetDiagnostics([DESCRIPTION] * 3, 0.5)
+
+    def test_summarize(self):
+        summary = self.diagnostics.summarize(self.fleet)
+
+        self.assertEqual(summary.number_of_houses, 3)
+        self.assertAlmostEqual(summary.indoor_temperature_min, 291.0)
+        self.assertAlmostEqual(summary.indoor_temperature_max, 291.65)
+        self.assertAlmostEqual(summary.buffer_temperature_mean, np.mean([315.0, 298.3, 338.0]))
+        self.assertEqual(summary.houses_near_lower_bound, 1)
+        self.assertEqual(summary.buffers_near_bounds, 2)
+
+    def test_log_step_summary_is_one_line(self):
+        with self.assertLogs(LOGGER, level="INFO") as logs:
+            self.diagnostics.log_step_summary("2024-01-01 00:15:00", self.fleet)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("1 houses near their lower bound, 2 buffers near their bounds", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
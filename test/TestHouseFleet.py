@@ -0,0 +1,174 @@
+import unittest
+from multiprocessing import shared_memory
+import numpy as np
+
+from hybridheatpumpservice.thermalsystems import EULER, EXACT, House, HeatBuffer
+from hybridheatpumpservice.fleet import HouseFleet
+from hybridheatpumpservice.sharding import ShardedHouseFleet
+
+
+CAPACITIES = {'C_in': 26146400.0, 'C_out': 78439200.0}
+RESISTANCES = {'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+               'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074}
+WINDOW_AREA = 31.39
+
+
+def create_house(scale : float, integration_method : str = EULER):
+    capacities = {name: value * scale for name, value in CAPACITIES.items()}
+    resistances = {name: value * scale ** 0.5 for name, value in RESISTANCES.items()}
+    return House(capacities, resistances, WINDOW_AREA, integration_method)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.esdl_ids = ["hhp-1", "hhp-2", "hhp-3"]
+        self.scales = [1.0, 0.8, 1.5]
+        self.inputs = {
+            "hhp-1": (282.45, 290.05, 0.0, 2000.0, 500.0),
+            "hhp-2": (283.15, 290.10, 120.0, 0.0, 3000.0),
+            "hhp-3": (284.65, 290.20, 350.0, 4500.0, 0.0),
+        }
+
+    def create_objects(self, integration_method : str = EULER):
+        houses = {}
+        heat_buffers = {}
+        for esdl_id, scale in zip(self.esdl_ids, self.scales):
+            houses[esdl_id] = create_house(scale, integration_method)
+            houses[esdl_id].set_initial_temperatures(291.65, 9000.0, 283.0, 290.05, 0.0)
+            heat_buffers[esdl_id] = HeatBuffer(752940.0 * scale)
+            heat_buffers[esdl_id].set_initial_temperature(315.0)
+        return houses, heat_buffers
+
+    def test_fleet_step_matches_per_house_update(self):
+        for integration_method in [EULER, EXACT]:
+            with self.subTest(integration_method=integration_method):
+                self.assert_fleet_step_matches_per_house_update(integration_method)
+
+    def assert_fleet_step_matches_per_house_update(self, integration_method : str):
+        # Arrange
+        expected_houses, expected_buffers = self.create_objects(integration_method)
+        houses, heat_buffers = self.create_objects(integration_method)
+        fleet = HouseFleet(self.esdl_ids, houses.values(), heat_buffers.values())
+        for esdl_id in self.esdl_ids:
+            fleet.bind(esdl_id)
+
+        # Execute
+        for _ in range(4):
+            for esdl_id in self.esdl_ids:
+                air, soil, solar, heat_to_house, heat_to_buffer = self.inputs[esdl_id]
+                expected_houses[esdl_id].update_temperatures(900, air, soil, solar, heat_to_house)
+                expected_buffers[esdl_id].update_temperature(900, heat_to_house, heat_to_buffer)
+                fleet.stage_inputs(esdl_id, air, soil, solar, heat_to_house, heat_to_buffer)
+            self.assertTrue(fleet.all_inputs_staged())
+            fleet.step(900)
+
+        # Assert
+        self.assertFalse(fleet.all_inputs_staged())
+        for esdl_id in self.esdl_ids:
+            np.testing.assert_array_equal(houses[esdl_id].temperatures, expected_houses[esdl_id].temperatures)
+            self.assertAlmostEqual(heat_buffers[esdl_id].temperature, expected_buffers[esdl_id].temperature)
+
+    def test_houses_and_buffers_are_views_on_the_fleet_state(self):
+        # Arrange
+        houses, heat_buffers = self.create_objects()
+        fleet = HouseFleet(self.esdl_ids, houses.values(), heat_buffers.values())
+        restored_houses, restored_buffers = self.create_objects()
+        restored_fleet = HouseFleet(self.esdl_ids, restored_houses.values(), restored_buffers.values())
+
+        # Execute
+        for esdl_id in self.esdl_ids:
+            fleet.bind(esdl_id)
+        restored_fleet.restore(self.esdl_ids, fleet.state.copy())
+        fleet.state[:] = 300.0
+        restored_fleet.state[:] = 305.0
+
+        # Assert
+        for esdl_id in self.esdl_ids:
+            for house, heat_buffer, expected_temperature in [(houses[esdl_id], heat_buffers[esdl_id], 300.0),
+                                                             (restored_houses[esdl_id], restored_buffers[esdl_id], 305.0)]:
+                self.assertEqual(house.temperatures.tolist(), [expected_temperature, expected_temperature])
+                self.assertEqual(heat_buffer.temperature, expected_temperature)
+        self.assertTrue(np.shares_memory(houses["hhp-2"].temperatures, fleet.state))
+        self.assertTrue(np.shares_memory(restored_buffers["hhp-2"].state, restored_fleet.state))
+
+    def test_restore_state_in_permuted_esdl_id_order(self):
+        # Arrange
+        houses, heat_buffers = self.create_objects()
+        fleet = HouseFleet(self.esdl_ids, houses.values(), heat_buffers.values())
+        checkpoint_esdl_ids = ["hhp-3", "hhp-1", "hhp-2"]
+        checkpoint_state = np.array([[293.0, 288.3, 323.0], [291.0, 288.1, 321.0], [292.0, 288.2, 322.0]])
+
+        # Execute
+        fleet.restore(checkpoint_esdl_ids, checkpoint_state)
+
+        # Assert
+        for esdl_id, expected_state in zip(checkpoint_esdl_ids, checkpoint_state.tolist()):
+            self.assertEqual(houses[esdl_id].temperatures.tolist(), expected_state[0:2])
+            self.assertEqual(heat_buffers[esdl_id].temperature, expected_state[2])
+            self.assertEqual(fleet.state[fleet.index[esdl_id]].tolist(), expected_state)
+
+    def test_fleet_sub_steps_match_per_house_updates(self):
+        # Arrange
+        expected_houses, expected_buffers = self.create_objects(EXACT)
+        houses, heat_buffers = self.create_objects(EXACT)
+        fleet = HouseFleet(self.esdl_ids, houses.values(), heat_buffers.values(), number_of_sub_steps=4)
+        for esdl_id in self.esdl_ids:
+            fleet.bind(esdl_id)
+        air_temperatures = [282.45, 283.15, 284.65, 285.0]
+        solar_irradiances = [0.0, 120.0, 350.0, 200.0]
+
+        # Execute
+        for esdl_id in self.esdl_ids:
+            _, soil, _, heat_to_house, heat_to_buffer = self.inputs[esdl_id]
+            for air, solar in zip(air_temperatures, solar_irradiances):
+                expected_houses[esdl_id].update_temperatures(900, air, soil, solar, heat_to_house)
+                expected_buffers[esdl_id].update_temperature(900, heat_to_house, heat_to_buffer)
+            fleet.stage_inputs(esdl_id, air_temperatures, soil, solar_irradiances, heat_to_house, heat_to_buffer)
+        fleet.step(3600)
+
+        # Assert
+        for esdl_id in self.esdl_ids:
+            np.testing.assert_array_equal(houses[esdl_id].temperatures, expected_houses[esdl_id].temperatures)
+            self.assertEqual(heat_buffers[esdl_id].temperature, expected_buffers[esdl_id].temperature)
+
+    def test_sharded_fleet_step_matches_fleet_step(self):
+        # Arrange
+        houses, heat_buffers = self.create_objects()
+        sharded_houses, sharded_heat_buffers = self.create_objects()
+        fleet = HouseFleet(self.esdl_ids, houses.values(), heat_buffers.values())
+        sharded_fleet = ShardedHouseFleet(self.esdl_ids, sharded_houses.values(), sharded_heat_buffers.values(), 2)
+        for esdl_id in self.esdl_ids:
+            fleet.bind(esdl_id)
+            sharded_fleet.bind(esdl_id)
+
+        # Execute
+        try:
+            for time_step in [900, 900, 300]:
+                for esdl_id in self.esdl_ids:
+                    fleet.stage_inputs(esdl_id, *self.inputs[esdl_id])
+                    sharded_fleet.stage_inputs(esdl_id, *self.inputs[esdl_id])
+                fleet.step(time_step)
+                sharded_fleet.step(time_step)
+        finally:
+            sharded_fleet.close()
+
+        # Assert
+        self.assertEqual(len(sharded_fleet.workers), 0)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=sharded_fleet.shared_memory.name)
+        np.testing.assert_array_equal(sharded_fleet.state, fleet.state)
+        for esdl_id in self.esdl_ids:
+            np.testing.assert_array_equal(sharded_houses[esdl_id].temperatures, houses[esdl_id].temperatures)
+            self.assertEqual(sharded_heat_buffers[esdl_id].temperature, heat_buffers[esdl_id].temperature)
+            self.assertTrue(np.shares_memory(sharded_houses[esdl_id].temperatures, sharded_fleet.state))
+
+    def test_stage_inputs_before_initialization_raises(self):
+        fleet = HouseFleet(["hhp-1"], [create_house(1.0)], [HeatBuffer(752940.0)])
+
+        with self.assertRaises(ValueError):
+            fleet.stage_inputs("hhp-1", 283.0, 290.0, 0.0, 0.0, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,18 @@
 from datetime import datetime
+import json
+import os
+import tempfile
 import unittest
+from unittest import mock
 import helics as h
+import numpy as np
 from dots_infrastructure.DataClasses import SimulatorConfiguration, TimeStepInformation
 from dots_infrastructure.test_infra.InfluxDBMock import InfluxDBMock
 from dots_infrastructure import CalculationServiceHelperFunctions
 from esdl.esdl_handler import EnergySystemHandler
 
 from hybridheatpumpservice.hybrid_heatpump_service import CalculationServiceHybridHeatPump
+from hybridheatpumpservice.publication import AggregatedValueFederateExecutor, unpack_temperatures
 
 
 BROKER_TEST_PORT = 23404
@@ -27,7 +33,8 @@ class Test(unittest.TestCase):
 
     def test_send_temperatures(self):
         # Arrange
-        service = CalculationServiceHybridHeatPump()
+        with mock.patch.dict(os.environ, {"hhp_free_float_forecast": "true"}):
+            service = CalculationServiceHybridHeatPump()
         service.influx_connector = InfluxDBMock()
 
         weather_params = {}
@@ -48,6 +55,26 @@ class Test(unittest.TestCase):
         self.assertAlmostEqual(ret_val["buffer_temperature"], expected_buffer_temperature)
         self.assertAlmostEqual(ret_val["house_temperatures"][0], expected_indoor_temperature)
         self.assertAlmostEqual(ret_val["house_temperatures"][1], expected_outdoor_temperature)
+        self.assertEqual(len(ret_val["predicted_house_temperatures_free_float"]), 4 * 48)
+
+    def test_send_temperatures_without_free_float_forecast(self):
+        # Arrange
+        service = CalculationServiceHybridHeatPump()
+        service.influx_connector = InfluxDBMock()
+        weather_params = {}
+        weather_params["solar_irradiance"] = [0.0, 8.333333333333334, 16.666666666666668, 25.0]
+        weather_params["air_temperature"] = [284.65, 284.1, 283.54999999999995, 283.0]
+        weather_params["soil_temperature"] = [290.04999999999995, 290.0583333333333, 290.06666666666666, 290.075]
+        service.init_calculation_service(self.energy_system)
+
+        # Execute
+        ret_val = service.send_temperatures(weather_params, datetime(2024, 1, 1), TimeStepInformation(1, 2),
+                                            "f9502a6a-982b-4df9-98b4-c2c6345267ac", self.energy_system)
+
+        # Assert
+        self.assertEqual(sorted(ret_val.keys()), ["buffer_temperature", "house_temperatures"])
+        self.assertEqual([output.output_name for output in service.calculations[0].helics_value_federate_info.outputs],
+                         ["buffer_temperature", "house_temperatures"])
 
     def test_update_temperatures(self):
         # Arrange
@@ -78,5 +105,141 @@ class Test(unittest.TestCase):
 
 
 
+    def test_update_temperatures_buffers_influx_points(self):
+        # Arrange
+        service = CalculationServiceHybridHeatPump()
+        service.influx_connector = InfluxDBMock()
+        service.settings.influx_flush_size = 100
+        service.settings.influx_extended_outputs = True
+
+        input_params = {}
+        input_params["solar_irradiance"] = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 8.333333333333334, 16.666666666666668, 25.0, 33.333333333333336, 59.72222222222223, 86.11111111111111, 112.5, 138.88888888888889, 174.99999999999997, 211.1111111111111, 247.22222222222223, 283.3333333333333, 308.3333333333333, 333.3333333333333, 358.33333333333326, 383.3333333333333, 376.38888888888886, 369.44444444444446, 362.5, 355.55555555555554, 309.72222222222223, 263.8888888888889, 218.0555555555556, 172.22222222222223, 188.19444444444443, 204.16666666666663, 220.13888888888889]
+        input_params["air_temperature"] = [284.65, 284.1, 283.54999999999995, 283.0, 282.45, 282.575, 282.7, 282.825, 282.95, 283.075, 283.2, 283.325, 283.45, 283.29999999999995, 283.15, 283.0, 282.85, 282.9, 282.95, 283.0, 283.04999999999995, 283.17499999999995, 283.29999999999995, 283.42499999999995, 283.54999999999995, 284.29999999999995, 285.04999999999995, 285.79999999999995, 286.54999999999995, 287.17499999999995, 287.79999999999995, 288.42499999999995, 289.04999999999995, 289.17499999999995, 289.29999999999995, 289.42499999999995, 289.54999999999995, 289.54999999999995, 289.54999999999995, 289.54999999999995, 289.54999999999995, 289.65, 289.75, 289.85, 289.95, 289.95, 289.95, 289.95]
+        input_params["soil_temperature"] = [290.04999999999995, 290.0583333333333, 290.06666666666666, 290.075, 290.0833333333333, 290.09166666666664, 290.1, 290.1083333333333, 290.1166666666666, 290.125, 290.1333333333333, 290.14166666666665, 290.15, 290.1583333333333, 290.16666666666663, 290.17499999999995, 290.18333333333334, 290.19166666666666, 290.2, 290.2083333333333, 290.21666666666664, 290.225, 290.2333333333333, 290.2416666666667, 290.25, 290.24583333333334, 290.2416666666667, 290.23749999999995, 290.2333333333333, 290.22916666666663, 290.225, 290.2208333333333, 290.21666666666664, 290.2125, 290.2083333333333, 290.20416666666665, 290.2, 290.1958333333333, 290.19166666666666, 290.1875, 290.18333333333334, 290.1791666666667, 290.17499999999995, 290.1708333333333, 290.16666666666663, 290.1625, 290.1583333333333, 290.15416666666664]
+        input_params["heat_power_to_buffer_hhp"] = 20
+        input_params["heat_power_to_house_hhp"] = 20
+
+        service.init_calculation_service(self.energy_system)
+
+        # Execute
+        service.send_temperatures(input_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), "f9502a6a-982b-4df9-98b4-c2c6345267ac", self.energy_system)
+        service.update_temperatures(input_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), "f9502a6a-982b-4df9-98b4-c2c6345267ac", self.energy_system)
+        buffered_data_points = list(service.influx_connector.data_points)
+        service.influx_output.flush(service.influx_connector)
+
+        # Assert
+        saved_datapoints = service.influx_connector.data_points
+        self.assertEqual(buffered_data_points, [])
+        self.assertEqual([data_point.output_name for data_point in saved_datapoints],
+                         ['buffer_temperature', 'house_temperature', 'house_outdoor_temperature', 'heat_power_to_house', 'heat_power_to_buffer'])
+        self.assertAlmostEqual(saved_datapoints[1].value, 291.75932454471314)
+        self.assertEqual(saved_datapoints[3].value, 20)
+
+    def test_update_temperatures_integrates_sub_steps_of_the_period(self):
+        # Arrange
+        esdl_id = "f9502a6a-982b-4df9-98b4-c2c6345267ac"
+        input_params = {}
+        input_params["solar_irradiance"] = [0.0, 8.333333333333334, 16.666666666666668, 25.0, 33.333333333333336, 59.72222222222223, 86.11111111111111, 112.5]
+        input_params["air_temperature"] = [284.65, 284.1, 283.54999999999995, 283.0, 282.45, 282.575, 282.7, 282.825]
+        input_params["soil_temperature"] = [290.04999999999995, 290.0583333333333, 290.06666666666666, 290.075, 290.0833333333333, 290.09166666666664, 290.1, 290.1083333333333]
+        input_params["heat_power_to_buffer_hhp"] = 3000
+        input_params["heat_power_to_house_hhp"] = 2000
+
+        with mock.patch.dict(os.environ, {"hhp_period_in_seconds": "3600", "hhp_internal_time_step_in_seconds": "900"}):
+            hourly_service = CalculationServiceHybridHeatPump()
+        quarterly_service = CalculationServiceHybridHeatPump()
+        for service in [hourly_service, quarterly_service]:
+            service.influx_connector = InfluxDBMock()
+            service.init_calculation_service(self.energy_system)
+            service.send_temperatures(input_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), esdl_id, self.energy_system)
+
+        # Execute
+        hourly_service.update_temperatures(input_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), esdl_id, self.energy_system)
+        for k in range(4):
+            shifted_params = {name: value[k:] if isinstance(value, list) else value for name, value in input_params.items()}
+            quarterly_service.update_temperatures(shifted_params, datetime(2024, 1, 1), TimeStepInformation(k + 1, 5), esdl_id, self.energy_system)
+
+        # Assert
+        self.assertEqual([calculation.helics_value_federate_info.time_period_in_seconds for calculation in hourly_service.calculations], [3600, 3600])
+        self.assertEqual(hourly_service.fleet.state.tolist(), quarterly_service.fleet.state.tolist())
+
+    def test_aggregated_publication_publishes_all_temperatures_in_one_message(self):
+        # Arrange
+        esdl_id = "f9502a6a-982b-4df9-98b4-c2c6345267ac"
+        weather_params = {}
+        weather_params["solar_irradiance"] = [0.0, 8.333333333333334, 16.666666666666668, 25.0]
+        weather_params["air_temperature"] = [284.65, 284.1, 283.54999999999995, 283.0]
+        weather_params["soil_temperature"] = [290.04999999999995, 290.0583333333333, 290.06666666666666, 290.075]
+        with mock.patch.dict(os.environ, {"hhp_aggregated_publication": "true", "hhp_free_float_forecast": "true"}):
+            service = CalculationServiceHybridHeatPump()
+        service.influx_connector = InfluxDBMock()
+        service.init_calculation_service(self.energy_system)
+        calculation = service.calculations[0]
+
+        federate_info = h.helicsCreateFederateInfo()
+        h.helicsFederateInfoSetCoreType(federate_info, h.HelicsCoreType.INPROC)
+        h.helicsFederateInfoSetCoreInitString(federate_info, "--autobroker")
+        value_federate = h.helicsCreateValueFederate("aggregated-publication-test", federate_info)
+        calculation.value_federate = value_federate
+        calculation.init_outputs(calculation.helics_value_federate_info.outputs, value_federate)
+        temperatures_input = h.helicsFederateRegisterSubscription(value_federate, "HybridHeatPump/fleet_temperatures/Mock-Econnection", "K")
+        manifest_input = h.helicsFederateRegisterSubscription(value_federate, "HybridHeatPump/fleet_temperatures_manifest/Mock-Econnection", "")
+        h.helicsFederateEnterExecutingMode(value_federate)
+
+        # Execute
+        ret_val = service.send_temperatures(weather_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), esdl_id, self.energy_system)
+        calculation._publish_outputs(esdl_id, ret_val)
+        h.helicsFederateRequestTime(value_federate, 900)
+        temperatures = unpack_temperatures(h.helicsInputGetBytes(temperatures_input))
+        manifest = h.helicsInputGetString(manifest_input)
+        h.helicsFederateDisconnect(value_federate)
+        h.helicsFederateFree(value_federate)
+
+        # Assert
+        self.assertEqual(list(ret_val.keys()), ["fleet_temperatures", "fleet_temperatures_manifest", "predicted_house_temperatures_free_float"])
+        self.assertEqual([output.output_name for output in calculation.output_dict[esdl_id]],
+                         ["predicted_house_temperatures_free_float", "fleet_temperatures", "fleet_temperatures_manifest"])
+        self.assertIsInstance(calculation, AggregatedValueFederateExecutor)
+        self.assertEqual(manifest, f'["{esdl_id}"]')
+        np.testing.assert_array_equal(temperatures, service.fleet.state)
+
+    def test_instrumentation_times_the_phases_of_the_calculations(self):
+        # Arrange
+        esdl_id = "f9502a6a-982b-4df9-98b4-c2c6345267ac"
+        input_params = {}
+        input_params["solar_irradiance"] = [0.0, 8.333333333333334, 16.666666666666668, 25.0]
+        input_params["air_temperature"] = [284.65, 284.1, 283.54999999999995, 283.0]
+        input_params["soil_temperature"] = [290.04999999999995, 290.0583333333333, 290.06666666666666, 290.075]
+        input_params["heat_power_to_buffer_hhp"] = 3000
+        input_params["heat_power_to_house_hhp"] = 2000
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "instrumentation.json")
+            with mock.patch.dict(os.environ, {"hhp_instrumentation": "true", "hhp_instrumentation_path": path, "hhp_free_float_forecast": "true",
+                                              "hhp_instrumentation_influx": "true"}):
+                service = CalculationServiceHybridHeatPump()
+            service.influx_connector = InfluxDBMock()
+
+            # Execute
+            service.init_calculation_service(self.energy_system)
+            service.send_temperatures(input_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), esdl_id, self.energy_system)
+            service.update_temperatures(input_params, datetime(2024, 1, 1), TimeStepInformation(1, 2), esdl_id, self.energy_system)
+            with mock.patch.object(service.influx_connector, "write") as write:
+                service.write_instrumentation()
+            with open(path) as report_file:
+                report = json.load(report_file)
+
+        # Assert
+        for phase in ["init_calculation_service", "send_temperatures.fetch_inputs", "send_temperatures.initialize",
+                      "send_temperatures.predict", "update_temperatures.fleet_step", "update_temperatures.bounds_check",
+                      "update_temperatures.influx_output"]:
+            self.assertEqual(report["phases"][phase]["count"], 1)
+        self.assertEqual(sum(report["latency_histograms"]["update_temperatures"]), 1)
+        self.assertIn("stop_simulation", report["peak_memory_kilobytes"])
+        (instrumentation_points,), _ = write.call_args
+        self.assertEqual(len(instrumentation_points), 1)
+        self.assertNotIn("esdl_id", instrumentation_points[0]["tags"])
+        self.assertIn("instrumentation.update_temperatures.fleet_step.mean_seconds", instrumentation_points[0]["fields"])
+
+
 if __name__ == '__main__':
     unittest.main()
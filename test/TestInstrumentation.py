@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from hybridheatpumpservice.instrumentation import LATENCY_BUCKET_BOUNDS_IN_SECONDS, NO_OP_TIMER, Instrumentation
+
+
+class Test(unittest.TestCase):
+
+    def test_report_phases_and_latency_histograms(self):
+        # Arrange
+        instrumentation = Instrumentation(True)
+
+        # Execute
+        for _ in range(3):
+            call_start = phase_start = time.perf_counter()
+            phase_start = instrumentation.record_phase("send_temperatures.fetch_inputs", phase_start)
+            instrumentation.record_phase("send_temperatures.predict", phase_start)
+            instrumentation.record_call("send_temperatures", call_start - 0.003)
+        instrumentation.record_peak_memory("init_calculation_service")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "instrumentation.json")
+            instrumentation.write(path)
+            with open(path) as report_file:
+                report = json.load(report_file)
+
+        # Assert
+        self.assertEqual(list(report["phases"].keys()), ["send_temperatures", "send_temperatures.fetch_inputs", "send_temperatures.predict"])
+        self.assertEqual(report["phases"]["send_temperatures.predict"]["count"], 3)
+        self.assertGreaterEqual(report["phases"]["send_temperatures"]["mean_seconds"], 0.003)
+        histogram = report["latency_histograms"]["send_temperatures"]
+        self.assertEqual(len(histogram), len(LATENCY_BUCKET_BOUNDS_IN_SECONDS) + 1)
+        self.assertEqual(histogram[LATENCY_BUCKET_BOUNDS_IN_SECONDS.index(5e-3)], 3)
+        self.assertGreater(report["peak_memory_kilobytes"]["init_calculation_service"], 0)
+
+    def test_timer_records_consecutive_phases_only_when_enabled(self):
+        # Arrange
+        instrumentation = Instrumentation(True)
+        disabled_instrumentation = Instrumentation(False)
+
+        # Execute
+        for current_instrumentation in [instrumentation, disabled_instrumentation]:
+            timer = current_instrumentation.timer("update_temperatures")
+            timer.lap("fetch_inputs")
+            timer.lap("fleet_step")
+            timer.stop()
+
+        # Assert
+        self.assertIs(disabled_instrumentation.timer("update_temperatures"), NO_OP_TIMER)
+        self.assertEqual(disabled_instrumentation.report()["phases"], {})
+        self.assertEqual(list(instrumentation.report()["phases"].keys()),
+                         ["update_temperatures", "update_temperatures.fetch_inputs", "update_temperatures.fleet_step"])
+        self.assertEqual(sum(instrumentation.latency_histograms["update_temperatures"]), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+from esdl.esdl_handler import EnergySystemHandler
+
+from hybridheatpumpservice.checkpoint import read_checkpoint
+from hybridheatpumpservice.offline_replay import load_inputs, replay
+
+ESDL_ID = "f9502a6a-982b-4df9-98b4-c2c6345267ac"
+AIR_TEMPERATURES = [284.65, 284.1, 283.54999999999995, 283.0, 282.45, 282.575]
+SOIL_TEMPERATURES = [290.04999999999995, 290.0583333333333, 290.06666666666666, 290.075, 290.0833333333333, 290.09166666666664]
+SOLAR_IRRADIANCES = [0.0, 0.0, 0.0, 0.0, 8.333333333333334, 16.666666666666668]
+
+
+def read_outputs(output_path):
+    with open(output_path, newline="") as output_file:
+        return [(row["time"], row["output_name"], float(row["value"])) for row in csv.DictReader(output_file)]
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        esh = EnergySystemHandler()
+        esh.load_file('test.esdl')
+        self.energy_system = esh.get_energy_system()
+        self.directory = tempfile.TemporaryDirectory()
+        self.heat_power_to_buffer = [20.0, 3000.0, 0.0, 1500.0, 0.0, 0.0]
+        self.heat_power_to_house = [20.0, 1000.0, 2000.0, 1500.0, 500.0, 0.0]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def write_npz_inputs(self):
+        np.savez(self.path("inputs.npz"), esdl_ids=[ESDL_ID], solar_irradiance=SOLAR_IRRADIANCES,
+                 air_temperature=AIR_TEMPERATURES, soil_temperature=SOIL_TEMPERATURES,
+                 heat_power_to_buffer_hhp=np.array([self.heat_power_to_buffer]).T,
+                 heat_power_to_house_hhp=np.array([self.heat_power_to_house]).T)
+        return load_inputs(self.path("inputs.npz"))
+
+    def write_csv_inputs(self):
+        with open(self.path("weather.csv"), "w", newline="") as weather_file:
+            writer = csv.writer(weather_file)
+            writer.writerow(["solar_irradiance", "air_temperature", "soil_temperature"])
+            writer.writerows(zip(SOLAR_IRRADIANCES, AIR_TEMPERATURES, SOIL_TEMPERATURES))
+        with open(self.path("heat_power.csv"), "w", newline="") as heat_power_file:
+            writer = csv.writer(heat_power_file)
+            writer.writerow(["time_step", "esdl_id", "heat_power_to_buffer_hhp", "heat_power_to_house_hhp"])
+            for k, (to_buffer, to_house) in enumerate(zip(self.heat_power_to_buffer, self.heat_power_to_house)):
+                writer.writerow([k, ESDL_ID, repr(to_buffer), repr(to_house)])
+        return load_inputs(self.path("weather.csv"), self.path("heat_power.csv"))
+
+    def test_replay_matches_service_update(self):
+        # Execute
+        replayed_time_steps = replay(self.energy_system, self.write_npz_inputs(), self.path("outputs.csv"), datetime(2024, 1, 1))
+
+        # Assert
+        outputs = read_outputs(self.path("outputs.csv"))
+        self.assertEqual(replayed_time_steps, 6)
+        self.assertEqual(len(outputs), 2 * 6)
+        self.assertEqual(outputs[0][:2], ("2024-01-01T00:15:00", "buffer_temperature"))
+        self.assertAlmostEqual(outputs[0][2], 315.93853596915767)
+        self.assertAlmostEqual(outputs[1][2], 291.75932454471314)
+
+    def test_csv_inputs_replay_as_npz_inputs(self):
+        # Execute
+        replay(self.energy_system, self.write_npz_inputs(), self.path("npz_outputs.csv"), datetime(2024, 1, 1))
+        replay(self.energy_system, self.write_csv_inputs(), self.path("csv_outputs.csv"), datetime(2024, 1, 1))
+
+        # Assert
+        self.assertEqual(read_outputs(self.path("npz_outputs.csv")), read_outputs(self.path("csv_outputs.csv")))
+
+    def test_replay_resumes_from_checkpoint(self):
+        # Arrange
+        checkpoint_path = self.path("checkpoint")
+        with mock.patch.dict(os.environ, {"hhp_checkpoint_path": checkpoint_path, "hhp_checkpoint_interval_in_time_steps": "4"}):
+            replay(self.energy_system, self.write_npz_inputs(), self.path("outputs.csv"), datetime(2024, 1, 1))
+
+        # Execute
+        with mock.patch.dict(os.environ, {"hhp_restore_checkpoint_path": checkpoint_path}):
+            replayed_time_steps = replay(self.energy_system, self.write_npz_inputs(), self.path("resumed_outputs.csv"), datetime(2024, 1, 1))
+
+        # Assert
+        self.assertEqual(replayed_time_steps, 2)
+        self.assertEqual(read_outputs(self.path("resumed_outputs.csv")), read_outputs(self.path("outputs.csv"))[2 * 4:])
+
+    def test_resumed_replay_numbers_checkpoints_after_the_restored_time_step(self):
+        # Arrange
+        checkpoint_path = self.path("checkpoint")
+        with mock.patch.dict(os.environ, {"hhp_checkpoint_path": checkpoint_path, "hhp_checkpoint_interval_in_time_steps": "4"}):
+            replay(self.energy_system, self.write_npz_inputs(), self.path("outputs.csv"), datetime(2024, 1, 1))
+
+        # Execute
+        with mock.patch.dict(os.environ, {"hhp_restore_checkpoint_path": checkpoint_path, "hhp_checkpoint_path": checkpoint_path,
+                                          "hhp_checkpoint_interval_in_time_steps": "3"}):
+            replay(self.energy_system, self.write_npz_inputs(), self.path("resumed_outputs.csv"), datetime(2024, 1, 1))
+        checkpoint = read_checkpoint(checkpoint_path)
+
+        # Assert
+        self.assertEqual(checkpoint.time_step_number, 6)
+        self.assertEqual(checkpoint.simulation_time, datetime(2024, 1, 1, 1, 30))
+        del checkpoint
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import numpy as np
+
+from hybridheatpumpservice.thermalsystems import EULER, EXACT, House, HouseModels
+
+
+CAPACITIES = {'C_in': 26146400.0, 'C_out': 78439200.0}
+RESISTANCES = {'R_exch': 0.0012422360248447205, 'R_floor': 0.011182795699309515,
+               'R_vent': 0.015427670676349235, 'R_cond': 0.0026857633907758074}
+WINDOW_AREA = 31.39
+
+
+def reference_initial_temperatures(house : House, initial_temp_in, nominal_heat, air_temperature, soil_temperature, solar_irradiance):
+    # The equilibrium solve with np.linalg.solve from before the closed form kernel
+    ambient_temperatures = np.array([air_temperature, soil_temperature])
+    solar_vector = np.array([house.window_area * solar_irradiance, 0.0])
+    A = house.K.copy()
+    A[:, 0] = np.array([-1.0, 0.0])
+    b = np.matmul(house.K_amb, ambient_temperatures) + solar_vector - initial_temp_in * house.K[:, 0].T
+    x = np.linalg.solve(A, b)
+    heat_to_house = np.clip(x[0], 0, nominal_heat)
+    temperatures = np.linalg.solve(house.K, np.matmul(house.K_amb, ambient_temperatures) + solar_vector + np.array([heat_to_house, 0]))
+    return temperatures, x[0]
+
+
+def reference_update_temperatures(house : House, time_step, air_temperature, soil_temperature, solar_irradiance, heat_to_house):
+    # The matrix form T[k+1] = A_d T[k] + B_d (K_amb T_amb + solar_vector + heat_to_house_vector)
+    A_d, B_d = house.discrete_time_matrices(time_step)
+    forcing = np.matmul(house.K_amb, np.array([air_temperature, soil_temperature])) + \
+        np.array([house.window_area * solar_irradiance + heat_to_house, 0.0])
+    return np.matmul(A_d, house.temperatures) + np.matmul(B_d, forcing)
+
+
+def create_house(integration_method : str, house_models : HouseModels = None):
+    house = House(CAPACITIES, RESISTANCES, WINDOW_AREA, integration_method, house_models)
+    house.set_initial_temperatures(291.65, 9000.0, 283.0, 290.05, 0.0)
+    return house
+
+
+class Test(unittest.TestCase):
+
+    def test_exact_integration_matches_fine_euler_integration(self):
+        # Arrange
+        exact_house = create_house(EXACT)
+        euler_house = create_house(EULER)
+
+        # Execute
+        exact_house.update_temperatures(3600, 280.0, 290.0, 150.0, 6000.0)
+        for _ in range(3600):
+            euler_house.update_temperatures(1, 280.0, 290.0, 150.0, 6000.0)
+
+        # Assert
+        np.testing.assert_allclose(exact_house.temperatures, euler_house.temperatures, atol=1e-3)
+
+    def test_exact_integration_is_independent_of_step_size(self):
+        # Arrange
+        daily_house = create_house(EXACT)
+        quarterly_house = create_house(EXACT)
+
+        # Execute
+        daily_house.update_temperatures(86400, 278.0, 289.0, 50.0, 3000.0)
+        for _ in range(96):
+            quarterly_house.update_temperatures(900, 278.0, 289.0, 50.0, 3000.0)
+
+        # Assert
+        np.testing.assert_allclose(daily_house.temperatures, quarterly_house.temperatures, rtol=1e-12)
+
+    def test_free_float_prediction_matches_stepwise_simulation(self):
+        for integration_method in [EULER, EXACT]:
+            with self.subTest(integration_method=integration_method):
+                # Arrange
+                house = create_house(integration_method)
+                air_temperatures = np.linspace(280.0, 284.0, 48)
+                soil_temperatures = np.linspace(290.0, 290.2, 48)
+                solar_irradiances = np.linspace(0.0, 350.0, 48)
+                simulated_house = create_house(integration_method)
+                heated_house = create_house(integration_method)
+
+                # Execute
+                predicted_temperatures = house.predict_free_float_temperatures(900, air_temperatures, soil_temperatures, solar_irradiances)
+                unit_heat_response = house.unit_heat_response(900, 48)
+                expected_temperatures = []
+                heated_temperatures = []
+                for k in range(48):
+                    simulated_house.update_temperatures(900, air_temperatures[k], soil_temperatures[k], solar_irradiances[k], 0.0)
+                    heated_house.update_temperatures(900, air_temperatures[k], soil_temperatures[k], solar_irradiances[k], 1000.0 if k == 0 else 0.0)
+                    expected_temperatures.append(simulated_house.temperatures.copy())
+                    heated_temperatures.append(heated_house.temperatures.copy())
+
+                # Assert
+                np.testing.assert_allclose(predicted_temperatures, expected_temperatures, rtol=1e-12)
+                np.testing.assert_allclose(1000.0 * unit_heat_response, np.array(heated_temperatures) - np.array(expected_temperatures), atol=1e-8)
+
+    def test_closed_form_kernel_matches_matrix_solution(self):
+        rng = np.random.default_rng(42)
+        set_point_offsets = []
+        capped_heat_demands = 0
+        for integration_method in [EULER, EXACT]:
+            for _ in range(50):
+                # Arrange
+                scale = rng.uniform(0.5, 2.0)
+                capacities = {name: value * scale for name, value in CAPACITIES.items()}
+                resistances = {name: value * rng.uniform(0.5, 2.0) for name, value in RESISTANCES.items()}
+                house = House(capacities, resistances, rng.uniform(5.0, 50.0), integration_method)
+                # From far below the heat demand, which caps the heat, to warm weather without any heat demand
+                nominal_heat = rng.choice([500.0, 3000.0, 9000.0, 20000.0])
+                weather = (rng.uniform(255.0, 300.0), rng.uniform(280.0, 292.0), rng.uniform(0.0, 800.0))
+                set_point = rng.uniform(288.0, 295.0)
+                time_step = rng.choice([60.0, 300.0, 900.0])
+                heat_to_house = rng.uniform(0.0, 10000.0)
+
+                # Execute
+                expected_initial_temperatures, required_heat_to_house = reference_initial_temperatures(house, set_point, nominal_heat, *weather)
+                temp_in, temp_out, _ = house.equilibrium_temperatures(set_point, nominal_heat, *weather)
+                initial_temperatures = np.array([temp_in, temp_out])
+                if required_heat_to_house > nominal_heat:
+                    # The heat is capped at the nominal heat, the set point check fails and leaves the house unset
+                    with self.assertRaises(AssertionError):
+                        house.set_initial_temperatures(set_point, nominal_heat, *weather)
+                    self.assertIsNone(house.temperatures)
+                    house.temperatures = initial_temperatures.copy()
+                    capped_heat_demands += 1
+                else:
+                    house.set_initial_temperatures(set_point, nominal_heat, *weather)
+                    np.testing.assert_array_equal(house.temperatures, initial_temperatures)
+                set_point_offsets.append(initial_temperatures[0] - set_point)
+                expected_temperatures = reference_update_temperatures(house, time_step, *weather, heat_to_house)
+                house.update_temperatures(time_step, *weather, heat_to_house)
+
+                # Assert
+                np.testing.assert_allclose(initial_temperatures, expected_initial_temperatures, rtol=1e-12)
+                np.testing.assert_allclose(house.temperatures, expected_temperatures, rtol=1e-12)
+        # The heat capped at the nominal heat, at zero (above the set point) and in between are all covered
+        self.assertGreater(capped_heat_demands, 0)
+        self.assertLess(min(set_point_offsets), -1.0e-3)
+        self.assertGreater(max(set_point_offsets), 1.0e-3)
+        self.assertLess(min(np.abs(set_point_offsets)), 1.0e-6)
+
+    def test_houses_with_equal_parameters_share_their_model(self):
+        # Arrange
+        house_models = HouseModels()
+        house = create_house(EULER, house_models)
+        same_house = create_house(EULER, house_models)
+        other_house = House(CAPACITIES, dict(RESISTANCES, R_vent=0.02), WINDOW_AREA, EULER, house_models)
+        unshared_house = create_house(EULER)
+
+        # Execute
+        same_house.update_temperatures(900, 280.0, 290.0, 0.0, 5000.0)
+
+        # Assert
+        self.assertIs(house.model, same_house.model)
+        self.assertIsNot(house.model, other_house.model)
+        self.assertIsNot(house.model, unshared_house.model)
+        self.assertEqual(len(house_models), 2)
+        self.assertFalse(house.K.flags.writeable)
+        self.assertFalse(np.array_equal(house.temperatures, same_house.temperatures))
+
+    def test_unknown_integration_method_raises(self):
+        with self.assertRaises(ValueError):
+            House(CAPACITIES, RESISTANCES, WINDOW_AREA, "runge-kutta")
+
+
+if __name__ == '__main__':
+    unittest.main()